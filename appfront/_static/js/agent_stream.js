@@ -0,0 +1,54 @@
+// Reads the server-sent events emitted by /api/*_agent_chat/stream/ and
+// dispatches them to handlers: onToken, onToolStart, onToolEnd, onFinal, onError.
+async function streamAgentChat(url, message, handlers) {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ message: message }),
+  });
+
+  if (!response.ok) {
+    const errorText = await response.text();
+    throw new Error(`HTTP error! status: ${response.status} - ${errorText}`);
+  }
+
+  const callbacks = {
+    token: handlers.onToken,
+    tool_start: handlers.onToolStart,
+    tool_end: handlers.onToolEnd,
+    final: handlers.onFinal,
+    error: handlers.onError,
+  };
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.substring(0, boundary);
+      buffer = buffer.substring(boundary + 2);
+
+      let eventName = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event: ')) eventName = line.substring(7);
+        else if (line.startsWith('data: ')) data += line.substring(6);
+      });
+
+      const callback = callbacks[eventName];
+      if (callback) callback(JSON.parse(data));
+    }
+  }
+}
+
+function toolOutputText(output) {
+  return Array.isArray(output) ? output.join('\n') : String(output ?? '');
+}
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appfront.settings')
 
 application = get_asgi_application()
+
+from common.agent_registry import warm_up
+
+# Optionally build agents at boot (AGENT_WARMUP=all or e.g. "movie,couple_movie")
+warm_up()
@@ -107,6 +107,17 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/#configuring-the-session-engine
+# Anonymous chat clients are identified by an id stored in their session
+# (common.session_state.request_session_ids), so every first-time visitor who
+# chats creates a session. The db engine writes one row per such visitor; use
+# 'django.contrib.sessions.backends.signed_cookies' or 'cached_db' under heavy
+# anonymous traffic.
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
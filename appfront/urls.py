@@ -21,11 +21,15 @@ from appfront import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.gemini_index, name='gemini_index'),
+    path('metrics', views.metrics_view, name='metrics'),
     path('chat/', include('chat.urls')),
     path('movie_agent_chat/', views.movie_agent_chat, name='movie_agent_chat'),
     path('api/movie_agent_chat/', views.movie_agent_api, name='movie_agent_api'),
+    path('api/movie_agent_chat/stream/', views.movie_agent_stream_api, name='movie_agent_stream_api'),
     path('spotify_agent_chat/', views.spotify_agent_chat, name='spotify_agent_chat'),
     path('api/spotify_agent_chat/', views.spotify_agent_api, name='spotify_agent_api'),
+    path('api/spotify_agent_chat/stream/', views.spotify_agent_stream_api, name='spotify_agent_stream_api'),
     path('couple_movie_agent_chat/', views.couple_movie_agent_chat, name='couple_movie_agent_chat'),
     path('api/couple_movie_agent_chat/', views.couple_movie_agent_api, name='couple_movie_agent_api'),
+    path('api/couple_movie_agent_chat/stream/', views.couple_movie_agent_stream_api, name='couple_movie_agent_stream_api'),
 ]
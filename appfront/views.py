@@ -1,10 +1,91 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
-from movie_agent.agent_main import agent_executor as movie_agent_executor
-from spotify_agent.agent_call import agent_executor as spotify_agent_executor
-from couple_movie_agent.couple_agent import agent_executor as couple_agent_executor
+import time
+from common import metrics
+from common.metrics_callbacks import METRICS_CONFIG
+from common.session_state import agent_run, arequest_session_ids, run_degraded, run_freshness
+from common.agent_registry import aget_agent_executor, aroute_message
+from common.response_cache import ainvoke_with_cache, aresponse_cache_key, response_cache
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _chunk_text(chunk):
+    content = getattr(chunk, "content", "")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+async def _agent_event_stream(agent_name, user_message, session_ids):
+    """Translate astream_events into server-sent events: token, tool_start, tool_end, final, error."""
+    start = time.perf_counter()
+    source = "cache"
+    with agent_run(*session_ids), metrics.agent_requests_in_flight.track_inprogress(agent=agent_name):
+        try:
+            cache_key = await aresponse_cache_key(agent_name, user_message)
+            cached = response_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                yield _sse("final", {"response": cached, "cached": True})
+                return
+
+            source = "router"
+            routed = await aroute_message(agent_name, user_message)
+            if routed is not None:
+                if cache_key and not run_degraded():
+                    response_cache.set(cache_key, routed)
+                yield _sse("final", {"response": routed, "freshness": run_freshness()})
+                return
+
+            source = "agent"
+            executor = await aget_agent_executor(agent_name)
+            async for event in executor.astream_events({"input": user_message}, config=METRICS_CONFIG, version="v2"):
+                kind = event["event"]
+                if kind == "on_chat_model_stream":
+                    text = _chunk_text(event["data"].get("chunk"))
+                    if text:
+                        yield _sse("token", {"text": text})
+                elif kind == "on_tool_start":
+                    yield _sse("tool_start", {"tool": event["name"], "input": event["data"].get("input")})
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    yield _sse("tool_end", {"tool": event["name"], "output": getattr(output, "content", output)})
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    output = (event["data"].get("output") or {}).get("output", "")
+                    if cache_key and output and not run_degraded():
+                        response_cache.set(cache_key, output)
+                    yield _sse("final", {"response": output, "freshness": run_freshness()})
+        except Exception as e:
+            source = "error"
+            print("[❌] Agent stream failed:", e)
+            yield _sse("error", {"error": str(e)})
+        finally:
+            metrics.agent_request_seconds.observe(time.perf_counter() - start, agent=agent_name, source=source)
+
+async def _stream_agent_response(request, agent_name):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    user_message = data.get('message')
+    if not user_message:
+        return JsonResponse({'error': 'No message provided'}, status=400)
+
+    session_ids = await arequest_session_ids(request, data)
+    response = StreamingHttpResponse(
+        _agent_event_stream(agent_name, user_message, session_ids),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def metrics_view(request):
+    """Prometheus scrape endpoint: tool, upstream and LLM latencies, token counts, cache ratios, in-flight gauges."""
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 def gemini_index(request):
     return render(request, 'gemini_index.html')
@@ -13,58 +94,73 @@ def movie_agent_chat(request):
     return render(request, 'movie_agent_chat.html')
 
 @csrf_exempt
-def movie_agent_api(request):
+async def movie_agent_api(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             user_message = data.get('message')
 
             if user_message:
-                response = movie_agent_executor.invoke({"input": user_message})
-                agent_response = response.get("output", "No response from movie agent.")
-                return JsonResponse({'response': agent_response})
+                with agent_run(*await arequest_session_ids(request, data)):
+                    agent_response, cached = await ainvoke_with_cache("movie", user_message, "No response from movie agent.")
+                    freshness = run_freshness()
+                return JsonResponse({'response': agent_response, 'cached': cached, 'freshness': freshness})
             else:
                 return JsonResponse({'error': 'No message provided'}, status=400)
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
     return JsonResponse({'error': 'Invalid request method'}, status=405)
 
+@csrf_exempt
+async def movie_agent_stream_api(request):
+    return await _stream_agent_response(request, "movie")
+
 def spotify_agent_chat(request):
     return render(request, 'spotify_agent_chat.html')
 
 @csrf_exempt
-def spotify_agent_api(request):
+async def spotify_agent_api(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             user_message = data.get('message')
 
             if user_message:
-                response = spotify_agent_executor.invoke({"input": user_message})
-                agent_response = response.get("output", "No response from spotify agent.")
-                return JsonResponse({'response': agent_response})
+                with agent_run(*await arequest_session_ids(request, data)):
+                    agent_response, cached = await ainvoke_with_cache("spotify", user_message, "No response from spotify agent.")
+                    freshness = run_freshness()
+                return JsonResponse({'response': agent_response, 'cached': cached, 'freshness': freshness})
             else:
                 return JsonResponse({'error': 'No message provided'}, status=400)
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
     return JsonResponse({'error': 'Invalid request method'}, status=405)
 
+@csrf_exempt
+async def spotify_agent_stream_api(request):
+    return await _stream_agent_response(request, "spotify")
+
 def couple_movie_agent_chat(request):
     return render(request, 'couple_movie_agent_chat.html')
 
 @csrf_exempt
-def couple_movie_agent_api(request):
+async def couple_movie_agent_api(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             user_message = data.get('message')
 
             if user_message:
-                response = couple_agent_executor.invoke({"input": user_message})
-                agent_response = response.get("output", "No response from couple movie agent.")
-                return JsonResponse({'response': agent_response})
+                with agent_run(*await arequest_session_ids(request, data)):
+                    agent_response, cached = await ainvoke_with_cache("couple_movie", user_message, "No response from couple movie agent.")
+                    freshness = run_freshness()
+                return JsonResponse({'response': agent_response, 'cached': cached, 'freshness': freshness})
             else:
                 return JsonResponse({'error': 'No message provided'}, status=400)
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
\ No newline at end of file
+    return JsonResponse({'error': 'Invalid request method'}, status=405)
+
+@csrf_exempt
+async def couple_movie_agent_stream_api(request):
+    return await _stream_agent_response(request, "couple_movie")
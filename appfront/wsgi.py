@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appfront.settings')
 
 application = get_wsgi_application()
+
+from common.agent_registry import warm_up
+
+# Optionally build agents at boot (AGENT_WARMUP=all or e.g. "movie,couple_movie")
+warm_up()
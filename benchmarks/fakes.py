@@ -0,0 +1,259 @@
+# fakes.py
+"""Local stand-ins for Emby, Qloo, Spotify and the chat models, used by benchmarks/run.py.
+
+Every fake server sleeps ``latency`` seconds per request and serves ``size``
+records, seeded from the repo's get_watched_movies.json and insights.json.
+"""
+import copy
+import json
+import time
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EMBY_USERS = {"bench": "bench-user-1", "bench2": "bench-user-2"}
+
+
+def _load_seed(name):
+    with open(os.path.join(REPO_ROOT, name), "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def entity_id(name):
+    """Deterministic Qloo entity id for a name, shared by the fake /search and the scripted agents."""
+    return hashlib.md5(name.casefold().encode("utf-8")).hexdigest().upper()
+
+
+def _replicate(seed, size, rename):
+    """``size`` records cycled from ``seed``; copies after the first round get unique names via ``rename``."""
+    records = []
+    for i in range(size):
+        record = copy.deepcopy(seed[i % len(seed)])
+        rename(record, i, i // len(seed))
+        records.append(record)
+    return records
+
+
+class FakeService:
+    """One fake upstream on a ThreadingHTTPServer; subclasses implement ``route(path, query)``."""
+
+    def __init__(self, latency=0.0, size=100):
+        self.latency = latency
+        self.size = size
+        self.requests = 0
+        self._server = None
+
+    def route(self, path, query):
+        raise NotImplementedError
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                service.requests += 1
+                if service.latency:
+                    time.sleep(service.latency)
+                url = urlparse(self.path)
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                status, payload = service.route(url.path.rstrip("/"), query)
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+
+def _page(items, query, start_key="StartIndex", limit_key="Limit"):
+    start = int(query.get(start_key, 0) or 0)
+    limit = query.get(limit_key)
+    return items[start:start + int(limit)] if limit else items[start:]
+
+
+class FakeEmby(FakeService):
+    """/Users, /Users/{id}/Items (played history), /Items (library, search) and /Items/Trending."""
+
+    def __init__(self, latency=0.0, size=200):
+        super().__init__(latency, size)
+        seed = _load_seed("get_watched_movies.json")["Items"]
+
+        def rename(item, i, round_):
+            if round_:
+                item["Name"] = f"{item['Name']} {round_ + 1}"
+            item["Id"] = str(100000 + i)
+            item["PremiereDate"] = f"{item.get('ProductionYear') or 2020}-01-01T00:00:00.0000000Z"
+            item["DateCreated"] = f"2025-01-01T00:00:{i % 60:02d}.0000000Z"
+            day = i % 28 + 1
+            item["UserData"] = {"Played": True, "LastPlayedDate": f"2025-{12 - i % 12:02d}-{day:02d}T00:00:00.0000000Z"}
+
+        self.items = _replicate(seed, size, rename)
+        self.played = sorted(self.items, key=lambda m: m["UserData"]["LastPlayedDate"], reverse=True)
+
+    def route(self, path, query):
+        if path == "/Users":
+            return 200, [{"Name": name, "Id": user_id} for name, user_id in EMBY_USERS.items()]
+        if path.startswith("/Users/") and path.endswith("/Items"):
+            return 200, {"Items": _page(self.played, query), "TotalRecordCount": len(self.played)}
+        if path == "/Items/Trending":
+            return 200, {"Items": self.items[:int(query.get("Limit", 20))]}
+        if path == "/Items":
+            items = self.items
+            term = query.get("SearchTerm")
+            if term:
+                items = [m for m in items if term.casefold() in m["Name"].casefold()]
+            return 200, {"Items": _page(items, query), "TotalRecordCount": len(items)}
+        return 404, {"error": f"unknown path {path}"}
+
+
+class FakeQloo(FakeService):
+    """/v2/insights (movie or artist entities, ``take`` honoured) and /search."""
+
+    def __init__(self, latency=0.0, size=50, movie_names=()):
+        super().__init__(latency, size)
+        seed = _load_seed("insights.json")["results"]["entities"]
+        self.artists = _replicate(seed, size, lambda e, i, r: e.update(name=f"{e['name']} {r + 1}") if r else None)
+        self.tags = _load_seed("insights.json")["results"].get("tags", [])
+        self.movie_names = list(movie_names)
+
+    def _movies(self, genre_urn):
+        genre = (genre_urn or "urn:tag:genre:media:drama").rsplit(":", 1)[-1]
+        label = genre.replace("_", " ").title()
+        movies = []
+        for i in range(self.size):
+            name = self.movie_names[i % len(self.movie_names)] if self.movie_names else f"Movie {i}"
+            movies.append({
+                "name": name,
+                "entity_id": entity_id(name),
+                "properties": {"release_year": 2021 + i % 4, "image": {"url": f"https://images.example/{i}.jpg"}},
+                "tags": [{"name": label, "type": "urn:tag:genre:media", "id": f"urn:tag:genre:media:{genre}"}],
+            })
+        return movies
+
+    def route(self, path, query):
+        if path == "/v2/insights":
+            take = int(query.get("take", self.size))
+            if query.get("filter.type") == "urn:entity:movie":
+                entities = self._movies(query.get("filter.tags"))[:take]
+            else:
+                entities = self.artists[:take]
+            return 200, {"success": True, "results": {"entities": entities, "tags": self.tags}}
+        if path == "/search":
+            name = query.get("query", "")
+            return 200, {"results": [{
+                "name": name,
+                "entity_id": entity_id(name),
+                "properties": {"image": {"url": "https://images.example/artist.jpg"}},
+                "tags": [{"name": "Pop", "type": "urn:tag:genre"}, {"name": "Upbeat", "type": "urn:tag:style:qloo"}],
+            }]}
+        return 404, {"error": f"unknown path {path}"}
+
+
+class FakeSpotify(FakeService):
+    """/me/playlists, /me/tracks, /me/player/recently-played and /playlists/{id}/tracks, offset-paginated."""
+
+    def __init__(self, latency=0.0, size=200, artists=()):
+        super().__init__(latency, size)
+        artists = list(artists) or ["Artist"]
+        self.artists = artists
+        self.tracks = [{
+            "added_at": f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "played_at": f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "track": {
+                "name": f"Track {i}",
+                "artists": [{"name": artists[i % len(artists)]}],
+                "album": {"name": f"Album {i // 10}", "release_date": f"{2000 + i % 25}-01-01"},
+            },
+        } for i in range(size)]
+        self.playlists = [{"name": f"Playlist {i}", "id": f"pl{i}", "snapshot_id": f"snap{i}"} for i in range(max(1, size // 20))]
+
+    def route(self, path, query):
+        if path == "/me/playlists":
+            items = self.playlists
+        elif path == "/me/tracks" or (path.startswith("/playlists/") and path.endswith("/tracks")):
+            items = self.tracks
+        elif path == "/me/player/recently-played":
+            return 200, {"items": self.tracks[:int(query.get("limit", 50))]}
+        else:
+            return 404, {"error": f"unknown path {path}"}
+        return 200, {"items": _page(items, query, "offset", "limit"), "total": len(items)}
+
+
+class StubGenerativeModel:
+    """Drop-in for google.generativeai.GenerativeModel: sleeps, then returns a canned explanation."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+
+        class Response:
+            text = "Your history leans towards character-driven drama, and these picks follow the same thread."
+        return Response()
+
+
+def scripted_chat_model(tool_calls, latency=0.0, reply=None):
+    """Chat model that issues ``tool_calls`` [(name, args), ...] in order, then answers with the last tool output.
+
+    Stands in for ChatGoogleGenerativeAI so the AgentExecutor loop runs for real
+    without a network call.
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class ScriptedChatModel(BaseChatModel):
+        script: list
+        delay: float = 0.0
+        final: str = ""
+
+        @property
+        def _llm_type(self):
+            return "scripted"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            if self.delay:
+                time.sleep(self.delay)
+            done = sum(isinstance(m, ToolMessage) for m in messages)
+            if done < len(self.script):
+                name, args = self.script[done]
+                message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{done}"}])
+            else:
+                last = messages[-1]
+                content = self.final or (last.content if isinstance(last, ToolMessage) else "Done.")
+                message = AIMessage(content=content)
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    return ScriptedChatModel(script=list(tool_calls), delay=latency, final=reply or "")
@@ -0,0 +1,294 @@
+# run.py
+"""Time the hot paths against local fakes and print machine-readable results.
+
+    python -m benchmarks.run --iterations 20 --output bench.json
+    python -m benchmarks.run --baseline bench.json      # compare with an earlier commit
+
+Emby, Qloo and Spotify are replaced by local HTTP servers (benchmarks/fakes.py)
+with configurable latency and payload size; the LangChain chat models and the
+Gemini explainer are replaced by scripted stubs, so the numbers measure our own
+code plus the simulated upstream latency. Everything writes into a temporary
+directory, leaving the repo's sqlite files and token cache untouched.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import REPO_ROOT, FakeEmby, FakeQloo, FakeSpotify, StubGenerativeModel, entity_id, scripted_chat_model
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before each benchmark")
+    parser.add_argument("--mode", choices=["cold", "warm"], default="cold",
+                        help="cold clears every cache, store and mirror (Qloo, LLM, responses, recommendations, "
+                             "artists, taste profiles, Emby library, user ids) before every timed run")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="default latency of every fake upstream")
+    parser.add_argument("--emby-latency-ms", type=float)
+    parser.add_argument("--qloo-latency-ms", type=float)
+    parser.add_argument("--spotify-latency-ms", type=float)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="latency of each stubbed LLM call")
+    parser.add_argument("--emby-items", type=int, default=500, help="played movies / library size served by Emby")
+    parser.add_argument("--qloo-entities", type=int, default=50, help="entities per Qloo insights response")
+    parser.add_argument("--spotify-items", type=int, default=500, help="tracks per Spotify listing")
+    parser.add_argument("--only", help="comma-separated benchmark names (prefix match)")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    return parser.parse_args(argv)
+
+
+def _ms(value, default):
+    return (default if value is None else value) / 1000.0
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "iterations": len(samples),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(p95, 3),
+        "min_ms": round(ordered[0], 3),
+        "max_ms": round(ordered[-1], 3),
+        "stdev_ms": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+    }
+
+
+def start_fakes(args):
+    emby = FakeEmby(_ms(args.emby_latency_ms, args.latency_ms), args.emby_items).start()
+    qloo = FakeQloo(_ms(args.qloo_latency_ms, args.latency_ms), args.qloo_entities,
+                    movie_names=[m["Name"] for m in emby.items]).start()
+    spotify = FakeSpotify(_ms(args.spotify_latency_ms, args.latency_ms), args.spotify_items,
+                          artists=[a["name"] for a in qloo.artists]).start()
+    return emby, qloo, spotify
+
+
+def configure_environment(emby, qloo, spotify, workdir):
+    """Point every client at the fakes; must run before any app module is imported."""
+    os.chdir(workdir)
+    os.environ.update({
+        "EMBY_SERVER": emby.url,
+        "EMBY_API_KEY": "bench",
+        "EMBY_USER": "bench",
+        "EMBY_USER_2": "bench2",
+        "QLOO_BASE_URL": qloo.url,
+        "QLOO_API_KEY": "bench",
+        "SPOTIFY_API_BASE": spotify.url,
+        "GEMINI_API_KEY": "bench",
+        "AGENT_WARMUP": "",
+        "DATA_DIR": workdir,
+        "DJANGO_SETTINGS_MODULE": "appfront.settings",
+    })
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+
+def install_stubs(args, spotify):
+    """Swap the chat models and the Gemini explainer for scripted stubs."""
+    import movie_agent.agent_main as movie_main
+    import movie_agent.gemini_utils as movie_gemini
+    import couple_movie_agent.couple_agent as couple_main
+    import couple_movie_agent.couple_gemini_utils as couple_gemini
+    import spotify_agent.agent_call as spotify_main
+    from spotify_agent.auth import token_manager, DEFAULT_SPOTIFY_USER
+
+    llm_latency = args.llm_latency_ms / 1000.0
+    artists = spotify.artists[:10]
+    scripts = {
+        movie_main: [("recommend_and_summarize_movies", {})],
+        couple_main: [("recommend_and_summarize_couple_movies", {"input": ""})],
+        spotify_main: [
+            ("get_liked_songs", {}),
+            ("get_artist_entity_id", {"names": artists}),
+            ("get_insights", {"entity_ids": [entity_id(a) for a in artists]}),
+        ],
+    }
+    for module, script in scripts.items():
+        module.ChatGoogleGenerativeAI = lambda script=script, **kwargs: scripted_chat_model(script, latency=llm_latency)
+    movie_gemini._model = StubGenerativeModel(llm_latency)
+    couple_gemini._model = StubGenerativeModel(llm_latency)
+    token_manager.set_token(DEFAULT_SPOTIFY_USER, {"access_token": "bench", "expires_at": time.time() + 86400})
+
+
+def reset_caches():
+    from common.qloo_utils import qloo_cache
+    from common.llm_cache import llm_cache
+    from common.response_cache import response_cache
+    from movie_agent._movie_tools import recommendation_cache as movie_recommendations
+    from couple_movie_agent.couple_tools import recommendation_cache as couple_recommendations
+    from spotify_agent.qloo_call import insights_cache
+    from spotify_agent.artist_resolver import get_store
+    from movie_agent.emby_library import reset_libraries
+    from movie_agent.emby_utils import _user_ids
+    from movie_agent.taste_profile import get_store as get_profile_store
+
+    for cache in (qloo_cache, llm_cache, response_cache, movie_recommendations, couple_recommendations, insights_cache):
+        cache.clear()
+    get_store().clear()
+    get_profile_store().clear()
+    reset_libraries()
+    _user_ids.clear()
+
+
+def setup_django():
+    import django
+    from django.conf import settings
+    from django.test.utils import setup_test_environment
+
+    settings.SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"  # no database needed
+    django.setup()
+    setup_test_environment()
+
+
+def build_benchmarks(spotify):
+    from common import metrics
+    from common.session_state import agent_run
+    from movie_agent._movie_tools import recommend_movies, recommend_and_summarize_movies, summarize_movie_taste
+    from couple_movie_agent.couple_tools import recommend_couple_movies, summarize_couple_taste, recommend_and_summarize_couple_movies
+    from spotify_agent.qloo_call import get_artist_entity_id, get_insights
+    from django.test import AsyncClient
+
+    artists = spotify.artists[:10]
+    entity_ids = [entity_id(a) for a in artists]
+    loop = asyncio.new_event_loop()
+    client = AsyncClient()
+
+    def tool(t, args):
+        def run():
+            with agent_run("bench", "tools"):
+                return t.invoke(args)
+        return run
+
+    def view(path, message, stream=False, routed_agent=None):
+        """``routed_agent`` marks a fast-path case: the run fails if that agent's LLM path answered instead."""
+        async def call():
+            response = await client.post(path, data=json.dumps({"message": message}), content_type="application/json")
+            if stream:
+                return [chunk async for chunk in response.streaming_content]
+            return response.json()
+
+        def run():
+            agent_runs = metrics.agent_request_seconds.count(agent=routed_agent, source="agent") if routed_agent else 0
+            result = loop.run_until_complete(call())
+            if routed_agent and metrics.agent_request_seconds.count(agent=routed_agent, source="agent") != agent_runs:
+                raise RuntimeError(f"{message!r} went through the LLM agent instead of the intent router")
+            return result
+        return run
+
+    return {
+        "tool.recommend_movies": tool(recommend_movies, {}),
+        "tool.recommend_movies[genre]": tool(recommend_movies, {"genre": "comedy"}),
+        "tool.summarize_movie_taste": tool(summarize_movie_taste, {}),
+        "tool.recommend_and_summarize_movies": tool(recommend_and_summarize_movies, {}),
+        "tool.get_artist_entity_id": tool(get_artist_entity_id, {"names": artists}),
+        "tool.get_insights": tool(get_insights, {"entity_ids": entity_ids}),
+        "tool.recommend_couple_movies": tool(recommend_couple_movies, {"input": ""}),
+        "tool.summarize_couple_taste": tool(summarize_couple_taste, {"input": ""}),
+        "tool.recommend_and_summarize_couple_movies": tool(recommend_and_summarize_couple_movies, {"input": ""}),
+        "view.movie_agent_api[routed]": view("/api/movie_agent_chat/", "Recommend some movies for me", routed_agent="movie"),
+        "view.movie_agent_api[agent]": view("/api/movie_agent_chat/", "What should I watch tonight, given my taste?"),
+        "view.movie_agent_stream_api": view("/api/movie_agent_chat/stream/", "What should I watch tonight, given my taste?", stream=True),
+        "view.couple_movie_agent_api": view("/api/couple_movie_agent_chat/", "Suggest something for us to watch"),
+        "view.couple_movie_agent_stream_api": view("/api/couple_movie_agent_chat/stream/", "Suggest something for us to watch", stream=True),
+        "view.spotify_agent_api": view("/api/spotify_agent_chat/", "Recommend artists based on my liked songs"),
+        "view.spotify_agent_stream_api": view("/api/spotify_agent_chat/stream/", "Recommend artists based on my liked songs", stream=True),
+    }
+
+
+def run_benchmark(fn, iterations, warmup, cold, services):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    requests_before = {name: s.requests for name, s in services.items()}
+    for _ in range(iterations):
+        if cold:
+            reset_caches()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    result = _summary(samples)
+    result["upstream_requests_per_run"] = {
+        name: round((s.requests - requests_before[name]) / iterations, 2) for name, s in services.items()
+    } if iterations else {}
+    return result
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    print(f"{'benchmark':50} {'baseline':>10} {'current':>10} {'change':>8}", file=sys.stderr)
+    for name, result in results["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if "error" in result:
+            print(f"{name:50} {'error':>10}", file=sys.stderr)
+            continue
+        if not before or "error" in before:
+            print(f"{name:50} {'-':>10} {result['median_ms']:>10.1f} {'new':>8}", file=sys.stderr)
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0.0
+        print(f"{name:50} {before['median_ms']:>10.1f} {result['median_ms']:>10.1f} {change:>+7.1f}%", file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    emby, qloo, spotify = start_fakes(args)
+    services = {"emby": emby, "qloo": qloo, "spotify": spotify}
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        configure_environment(emby, qloo, spotify, workdir)
+        install_stubs(args, spotify)
+        setup_django()
+        benchmarks = build_benchmarks(spotify)
+        selected = [p.strip() for p in args.only.split(",")] if args.only else None
+
+        results = {}
+        for name, fn in benchmarks.items():
+            if selected and not any(name.startswith(p) for p in selected):
+                continue
+            print(f"[⏱️] {name}", file=sys.stderr)
+            try:
+                results[name] = run_benchmark(fn, args.iterations, args.warmup, args.mode == "cold", services)
+            except Exception as e:
+                print(f"[❌] {name} failed: {e}", file=sys.stderr)
+                results[name] = {"error": str(e)}
+
+    for service in services.values():
+        service.stop()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,13 @@ from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
-
-from spotify_agent.agent_call import agent_executor as spotify_agent_executor
-from movie_agent.agent_main import agent_executor as movie_agent_executor
+from common.session_state import agent_run, arequest_session_ids, run_freshness
+from common.response_cache import ainvoke_with_cache
 
 # Create your views here.
 
 @csrf_exempt
-def spotify_agent_view(request):
+async def spotify_agent_view(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
@@ -17,14 +16,16 @@ def spotify_agent_view(request):
             if not user_input:
                 return JsonResponse({'error': 'No user input provided'}, status=400)
             
-            response = spotify_agent_executor.invoke({'input': user_input})
-            return JsonResponse({'response': response.get('output', '')})
+            with agent_run(*await arequest_session_ids(request, data)):
+                agent_response, cached = await ainvoke_with_cache("spotify", user_input)
+                freshness = run_freshness()
+            return JsonResponse({'response': agent_response, 'cached': cached, 'freshness': freshness})
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
     return JsonResponse({'error': 'Only POST requests are supported'}, status=405)
 
 @csrf_exempt
-def movie_agent_view(request):
+async def movie_agent_view(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
@@ -32,8 +33,10 @@ def movie_agent_view(request):
             if not user_input:
                 return JsonResponse({'error': 'No user input provided'}, status=400)
             
-            response = movie_agent_executor.invoke({'input': user_input})
-            return JsonResponse({'response': response.get('output', '')})
+            with agent_run(*await arequest_session_ids(request, data)):
+                agent_response, cached = await ainvoke_with_cache("movie", user_input)
+                freshness = run_freshness()
+            return JsonResponse({'response': agent_response, 'cached': cached, 'freshness': freshness})
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
     return JsonResponse({'error': 'Only POST requests are supported'}, status=405)
\ No newline at end of file
@@ -0,0 +1,78 @@
+# agent_registry.py
+import os
+import importlib
+import threading
+from asgiref.sync import sync_to_async
+
+# Agent name -> "module:builder" that returns an AgentExecutor
+AGENT_BUILDERS = {
+    "movie": "movie_agent.agent_main:build_agent_executor",
+    "spotify": "spotify_agent.agent_call:build_agent_executor",
+    "couple_movie": "couple_movie_agent.couple_agent:build_agent_executor",
+}
+
+# Agent name -> "module:function" answering common requests without the LLM; returns None to fall back
+AGENT_ROUTERS = {
+    "movie": "movie_agent.intent_router:route",
+}
+
+_executors = {}
+_locks = {name: threading.Lock() for name in AGENT_BUILDERS}
+
+
+def get_agent_executor(name):
+    """Return the executor for ``name``, importing and building it on first use."""
+    executor = _executors.get(name)
+    if executor is not None:
+        return executor
+    if name not in AGENT_BUILDERS:
+        raise KeyError(f"Unknown agent '{name}'")
+    with _locks[name]:
+        if name not in _executors:
+            module_name, builder_name = AGENT_BUILDERS[name].split(":")
+            builder = getattr(importlib.import_module(module_name), builder_name)
+            _executors[name] = builder()
+            print(f"[🤖] Built '{name}' agent executor")
+        return _executors[name]
+
+
+async def aget_agent_executor(name):
+    """Async-view variant of get_agent_executor; the first build runs off the event loop."""
+    executor = _executors.get(name)
+    if executor is not None:
+        return executor
+    return await sync_to_async(get_agent_executor, thread_sensitive=False)(name)
+
+
+def route_message(name, message):
+    """Fast-path reply for ``name`` from its intent router, or None when the agent should handle it."""
+    target = AGENT_ROUTERS.get(name)
+    if not target:
+        return None
+    module_name, func_name = target.split(":")
+    try:
+        return getattr(importlib.import_module(module_name), func_name)(message)
+    except Exception as e:
+        print(f"[❌] Intent router failed for '{name}' agent: {e}")
+        return None
+
+
+async def aroute_message(name, message):
+    """Async-view variant of route_message; the routed tool calls run off the event loop."""
+    if name not in AGENT_ROUTERS:
+        return None
+    return await sync_to_async(route_message, thread_sensitive=False)(name, message)
+
+
+def warm_up(names=None):
+    """Build agents ahead of traffic. ``names`` defaults to the AGENT_WARMUP env var ("all" or a comma list)."""
+    if names is None:
+        setting = os.getenv("AGENT_WARMUP", "").strip()
+        if not setting:
+            return
+        names = list(AGENT_BUILDERS) if setting == "all" else [n.strip() for n in setting.split(",") if n.strip()]
+    for name in names:
+        try:
+            get_agent_executor(name)
+        except Exception as e:
+            print(f"[❌] Warm-up failed for '{name}' agent: {e}")
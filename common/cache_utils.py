@@ -0,0 +1,103 @@
+# cache_utils.py
+import json
+import time
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+
+_caches = weakref.WeakSet()
+
+
+def all_caches():
+    """Every live TTLCache, for the /metrics hit-ratio series."""
+    return sorted(_caches, key=lambda cache: cache.name)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry TTL.
+
+    When ``db_path`` is given, entries are also written to a sqlite table so they
+    survive restarts; a memory miss falls back to the disk tier before counting
+    as a miss. Values must be JSON-serializable for the disk tier.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, db_path=None, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._db = None
+        _caches.add(self)
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at),
+                )
+                self._db.commit()
+
+    def _store(self, key, value, expires_at):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
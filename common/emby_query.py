@@ -0,0 +1,21 @@
+# emby_query.py
+import os
+
+EMBY_LEAN = os.getenv("EMBY_LEAN", "1") != "0"  # drop images and user data Emby would otherwise send with every item
+
+
+def item_query(fields=None, user_data=False):
+    """Emby item query parameters that project responses onto what the caller reads.
+
+    ``fields`` is the minimal Fields list added to Emby's defaults (Name, Id,
+    ProductionYear, ...). In lean mode images are never returned and UserData only
+    when ``user_data`` is set, e.g. for play dates; Filters=IsPlayed still works
+    without it.
+    """
+    params = {}
+    if fields:
+        params['Fields'] = fields
+    if EMBY_LEAN:
+        params['EnableImages'] = 'false'
+        params['EnableUserData'] = 'true' if user_data else 'false'
+    return params
@@ -0,0 +1,115 @@
+# http_utils.py
+import os
+import time
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from common import metrics
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # number of hosts kept in the pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))  # keep-alive connections per host
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_COALESCE = os.getenv("HTTP_COALESCE", "1") != "0"  # share one in-flight GET among identical callers
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests.Session shared by every upstream integration.
+
+    Connections are kept alive per host, so repeated Emby, Qloo and Spotify calls
+    skip the DNS lookup and TCP/TLS handshake after the first request.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def request(method, url, **kwargs):
+    """Send a request through the shared session with default connect/read timeouts.
+
+    Latency and in-flight counts are recorded per upstream host for /metrics.
+    """
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    host = urlsplit(url).netloc
+    status = "error"
+    start = time.perf_counter()
+    with metrics.upstream_requests_in_flight.track_inprogress(host=host):
+        try:
+            response = get_session().request(method, url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            metrics.upstream_seconds.observe(time.perf_counter() - start, host=host, method=method, status=status)
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _coalesce_key(url, kwargs):
+    params = kwargs.get("params")
+    if isinstance(params, dict):
+        params = tuple(sorted((str(k), str(v)) for k, v in params.items() if v is not None))
+    elif params is not None:
+        params = str(params)
+    headers = tuple(sorted((str(k).lower(), str(v)) for k, v in (kwargs.get("headers") or {}).items()))
+    return url, params, headers
+
+
+def get(url, **kwargs):
+    """GET through the shared session, coalescing identical concurrent requests.
+
+    While a GET for the same URL, params and headers is in flight, later callers
+    wait for it and receive the same Response (its body is already read) or the
+    same exception, instead of sending a duplicate upstream. Headers are part of
+    the key, so different Spotify accounts never share a response.
+    """
+    if not HTTP_COALESCE or kwargs.get("stream"):
+        return request("GET", url, **kwargs)
+
+    key = _coalesce_key(url, kwargs)
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _InFlight()
+
+    if not leader:
+        metrics.upstream_coalesced.inc(host=urlsplit(url).netloc)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.response
+
+    try:
+        call.response = request("GET", url, **kwargs)
+        return call.response
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call.done.set()
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
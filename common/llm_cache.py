@@ -0,0 +1,25 @@
+# llm_cache.py
+import os
+import json
+import hashlib
+from common.cache_utils import TTLCache
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB")  # optional sqlite file for a persistent tier
+
+llm_cache = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, db_path=LLM_CACHE_DB, name="llm")
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def llm_cache_key(model_name, prompt_kind, **inputs):
+    """Content hash of the model name, prompt template and normalized prompt inputs."""
+    payload = {"model": model_name, "kind": prompt_kind, "inputs": _normalize(inputs)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
@@ -0,0 +1,235 @@
+# metrics.py
+"""Minimal in-process metrics registry rendered in the Prometheus text format.
+
+Only what the /metrics view needs: counters, gauges and histograms with labels,
+plus collectors evaluated at scrape time (cache hit ratios).
+"""
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        """Observations recorded so far for one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, {"le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """``collect()`` is called at scrape time and returns extra exposition lines."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collect in collectors:
+            try:
+                lines.extend(collect())
+            except Exception as e:
+                print(f"[❌] Metrics collector failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+agent_requests_in_flight = registry.register(Gauge(
+    "agent_requests_in_flight", "Agent requests currently being served.", ["agent"]))
+agent_request_seconds = registry.register(Histogram(
+    "agent_request_duration_seconds", "End-to-end agent request latency by how it was answered.", ["agent", "source"]))
+tool_seconds = registry.register(Histogram(
+    "agent_tool_duration_seconds", "LangChain tool latency.", ["tool", "status"]))
+upstream_requests_in_flight = registry.register(Gauge(
+    "upstream_requests_in_flight", "Outbound HTTP requests currently in flight.", ["host"]))
+upstream_coalesced = registry.register(Counter(
+    "upstream_requests_coalesced_total", "GETs answered by an identical request already in flight.", ["host"]))
+upstream_retries = registry.register(Counter(
+    "upstream_retries_total", "Upstream requests retried, by the failure that triggered the retry.", ["host", "reason"]))
+upstream_hedged = registry.register(Counter(
+    "upstream_requests_hedged_total", "Duplicate requests sent for slow upstream calls, by which copy answered first.",
+    ["host", "winner"]))
+rate_limit_wait_seconds = registry.register(Histogram(
+    "upstream_rate_limit_wait_seconds", "Time spent waiting for a client-side rate-limit token.", ["host"]))
+upstream_seconds = registry.register(Histogram(
+    "upstream_request_duration_seconds", "Outbound HTTP request latency.", ["host", "method", "status"]))
+swr_lookups = registry.register(Counter(
+    "swr_lookups_total", "Stale-while-revalidate lookups by the freshness of what was served.", ["cache", "status"]))
+swr_refreshes = registry.register(Counter(
+    "swr_refreshes_total", "Background refreshes of stale entries.", ["cache", "status"]))
+llm_seconds = registry.register(Histogram(
+    "llm_call_duration_seconds", "LLM call latency.", ["model"]))
+llm_tokens = registry.register(Counter(
+    "llm_tokens_total", "LLM tokens consumed.", ["model", "kind"]))
+
+
+def record_llm_tokens(model, input_tokens=None, output_tokens=None):
+    if input_tokens:
+        llm_tokens.inc(input_tokens, model=model, kind="input")
+    if output_tokens:
+        llm_tokens.inc(output_tokens, model=model, kind="output")
+
+
+def record_genai_usage(model, response):
+    """Token counts from a google.generativeai response's ``usage_metadata``, when present."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        record_llm_tokens(model, getattr(usage, "prompt_token_count", 0), getattr(usage, "candidates_token_count", 0))
+
+
+def _cache_lines():
+    from common.cache_utils import all_caches
+
+    caches = all_caches()
+    series = {
+        "cache_hits_total": ("counter", "Cache hits (memory and disk tiers).", "hits"),
+        "cache_misses_total": ("counter", "Cache misses.", "misses"),
+        "cache_hit_ratio": ("gauge", "Hits / lookups since start.", "hit_ratio"),
+        "cache_entries": ("gauge", "Entries held in memory.", "size"),
+    }
+    stats = [(cache.name, cache.stats()) for cache in caches]
+    lines = []
+    for name, (kind, doc, field) in series.items():
+        lines += [f"# HELP {name} {doc}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{cache="{_escape(cache)}"}} {_format_value(s.get(field, 0))}' for cache, s in stats]
+    return lines
+
+
+registry.add_collector(_cache_lines)
+
+
+def render():
+    return registry.render()
@@ -0,0 +1,88 @@
+# metrics_callbacks.py
+import time
+import threading
+from langchain_core.callbacks import BaseCallbackHandler
+from common import metrics
+from common.session_state import note_error
+
+
+def _model_name(serialized, kwargs):
+    metadata = kwargs.get("metadata") or {}
+    params = kwargs.get("invocation_params") or {}
+    return (
+        metadata.get("ls_model_name")
+        or params.get("model")
+        or params.get("model_name")
+        or ((serialized or {}).get("id") or ["unknown"])[-1]
+    )
+
+
+def _token_usage(response):
+    """(input, output) token counts from an LLMResult, whichever way the provider reports them."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            input_tokens += meta.get("input_tokens", 0)
+            output_tokens += meta.get("output_tokens", 0)
+    return input_tokens, output_tokens
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Feeds tool and LLM latencies and token counts into common.metrics, keyed by run id."""
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, name):
+        with self._lock:
+            self._runs[run_id] = (name, time.perf_counter())
+
+    def _stop(self, run_id):
+        with self._lock:
+            name, start = self._runs.pop(run_id, (None, None))
+        return name, (time.perf_counter() - start) if start is not None else None
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, (serialized or {}).get("name") or kwargs.get("name") or "unknown")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        name, elapsed = self._stop(run_id)
+        if isinstance(output, dict) and "error" in output:
+            note_error(name, output["error"])
+        if elapsed is not None:
+            metrics.tool_seconds.observe(elapsed, tool=name, status="ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        name, elapsed = self._stop(run_id)
+        note_error(name, error)
+        if elapsed is not None:
+            metrics.tool_seconds.observe(elapsed, tool=name, status="error")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, _model_name(serialized, kwargs))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, _model_name(serialized, kwargs))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, elapsed = self._stop(run_id)
+        if elapsed is None:
+            return
+        metrics.llm_seconds.observe(elapsed, model=model)
+        metrics.record_llm_tokens(model, *_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        model, elapsed = self._stop(run_id)
+        if elapsed is not None:
+            metrics.llm_seconds.observe(elapsed, model=model)
+
+
+metrics_handler = MetricsCallbackHandler()
+
+# Pass as ``config`` to invoke / ainvoke / astream_events; callbacks in config reach every tool and LLM run
+METRICS_CONFIG = {"callbacks": [metrics_handler]}
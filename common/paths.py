@@ -0,0 +1,11 @@
+# paths.py
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(REPO_ROOT, "data"))  # local sqlite stores live here (git-ignored)
+
+
+def data_path(name):
+    """Path of a local data file under DATA_DIR, creating the directory if needed."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
@@ -0,0 +1,211 @@
+# qloo_utils.py
+import os
+import time
+import random
+import threading
+import email.utils
+import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from common import http_utils, metrics
+from common.cache_utils import TTLCache
+from common.json_utils import response_json
+from common.session_state import is_revalidating
+
+load_dotenv()
+
+QLOO_BASE_URL = os.getenv("QLOO_BASE_URL", "https://hackathon.api.qloo.com").rstrip("/")
+QLOO_CACHE_SIZE = int(os.getenv("QLOO_CACHE_SIZE", "2048"))
+QLOO_CACHE_DB = os.getenv("QLOO_CACHE_DB")  # optional sqlite file for a persistent tier
+QLOO_RATE_LIMIT = float(os.getenv("QLOO_RATE_LIMIT", "10"))  # sustained requests per second our quota allows; 0 disables
+QLOO_BURST = int(os.getenv("QLOO_BURST", "20"))  # requests allowed back to back before throttling kicks in
+QLOO_MAX_RETRIES = int(os.getenv("QLOO_MAX_RETRIES", "3"))  # retries after a 429/5xx or connection failure
+QLOO_BACKOFF_BASE = float(os.getenv("QLOO_BACKOFF_BASE", "0.5"))  # seconds; doubles per attempt, fully jittered
+QLOO_BACKOFF_MAX = float(os.getenv("QLOO_BACKOFF_MAX", "10"))  # longest single wait, Retry-After included
+QLOO_HEDGE_AFTER = float(os.getenv("QLOO_HEDGE_AFTER", "0"))  # seconds before a duplicate request is sent; 0 disables
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Seconds a response stays cached, per endpoint
+QLOO_TTLS = {
+    "/v2/insights": int(os.getenv("QLOO_INSIGHTS_TTL", "3600")),
+    "/search": int(os.getenv("QLOO_SEARCH_TTL", "86400")),
+}
+
+qloo_cache = TTLCache(maxsize=QLOO_CACHE_SIZE, db_path=QLOO_CACHE_DB, name="qloo")
+
+
+class TokenBucket:
+    """Client-side rate limiter: ``rate`` tokens per second, at most ``capacity`` saved up.
+
+    A rate of 0 disables limiting. ``pause`` empties the bucket so every caller
+    waits out a server-side throttle together instead of retrying into it.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, block=True):
+        """Take a token, sleeping until one is available; with ``block=False``, return False instead."""
+        if not self.rate:
+            return True
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if not block:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller back for ``seconds`` (e.g. a 429's Retry-After)."""
+        if not self.rate:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+_bucket = TokenBucket(QLOO_RATE_LIMIT, QLOO_BURST)
+# Separate pools, so hedges never queue behind the primaries they are meant to overtake
+_primary_pool = ThreadPoolExecutor(max_workers=http_utils.HTTP_POOL_MAXSIZE, thread_name_prefix="qloo-primary")
+_hedge_pool = ThreadPoolExecutor(max_workers=http_utils.HTTP_POOL_MAXSIZE, thread_name_prefix="qloo-hedge")
+
+
+def _cache_key(path, params):
+    normalized = sorted(
+        (str(k), " ".join(str(v).split()))
+        for k, v in (params or {}).items() if v is not None
+    )
+    return path + "?" + "&".join(f"{k}={v}" for k, v in normalized)
+
+
+def _retry_after(response):
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2**attempt)]."""
+    return random.uniform(0, min(QLOO_BACKOFF_MAX, QLOO_BACKOFF_BASE * 2 ** attempt))
+
+
+def _acquire():
+    start = time.perf_counter()
+    _bucket.acquire()
+    waited = time.perf_counter() - start
+    if waited > 0.001:
+        metrics.rate_limit_wait_seconds.observe(waited, host=urlsplit(QLOO_BASE_URL).netloc)
+
+
+def _send(url, headers, params):
+    """One rate-limited GET, duplicated after QLOO_HEDGE_AFTER seconds when a spare token allows it.
+
+    The hedge delay counts from when the primary actually starts, not from when it
+    was queued. The hedge bypasses http_utils' request coalescing (it would
+    otherwise just join the slow request) and the first copy to answer wins.
+    """
+    _acquire()
+    if not QLOO_HEDGE_AFTER:
+        return http_utils.get(url, headers=headers, params=params)
+
+    started = threading.Event()
+
+    def send_primary():
+        started.set()
+        return http_utils.get(url, headers=headers, params=params)
+
+    primary = _primary_pool.submit(send_primary)
+    started.wait()
+    try:
+        return primary.result(timeout=QLOO_HEDGE_AFTER)
+    except FutureTimeout:
+        pass
+    # Never exceed the quota for a hedge: without a spare token, keep waiting on the original
+    if not _bucket.acquire(block=False):
+        return primary.result()
+
+    hedge = _hedge_pool.submit(http_utils.request, "GET", url, headers=headers, params=params)
+    host = urlsplit(url).netloc
+    error = None
+    for future in as_completed([primary, hedge]):
+        try:
+            response = future.result()
+        except Exception as e:
+            error = e
+            continue
+        metrics.upstream_hedged.inc(host=host, winner="hedge" if future is hedge else "primary")
+        return response
+    raise error
+
+
+def qloo_get(path, params=None):
+    """GET a Qloo endpoint and return the decoded JSON body.
+
+    Successful responses are cached on the normalized query parameters for the
+    endpoint's TTL. Requests draw from a token bucket sized to the Qloo quota;
+    429/5xx responses and connection failures are retried with jittered
+    exponential backoff, waiting at least as long as Retry-After asks. A 429
+    pauses the bucket for every caller. Once retries run out (or Retry-After
+    exceeds QLOO_BACKOFF_MAX), non-2xx responses raise requests.HTTPError and are
+    not cached.
+
+    During a stale-while-revalidate refresh (session_state.revalidating) the
+    cached copy is skipped and replaced by the new response.
+    """
+    path = "/" + path.strip("/")
+    key = _cache_key(path, params)
+    cached = None if is_revalidating() else qloo_cache.get(key)
+    if cached is not None:
+        return cached
+
+    url = QLOO_BASE_URL + path
+    headers = {"x-api-key": os.getenv("QLOO_API_KEY")}
+    for attempt in range(QLOO_MAX_RETRIES + 1):
+        try:
+            res = _send(url, headers, params)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == QLOO_MAX_RETRIES:
+                raise
+            reason, delay = "connection", _backoff(attempt)
+            print(f"[⏳] Qloo {path} failed ({e}), retrying in {delay:.1f}s")
+        else:
+            if res.status_code not in RETRY_STATUSES or attempt == QLOO_MAX_RETRIES:
+                break
+            retry_after = _retry_after(res)
+            if retry_after is not None and retry_after > QLOO_BACKOFF_MAX:
+                break  # not worth holding the request that long
+            reason, delay = str(res.status_code), max(retry_after or 0.0, _backoff(attempt))
+            if res.status_code == 429:
+                _bucket.pause(delay)
+            print(f"[⏳] Qloo {path} returned {res.status_code}, retrying in {delay:.1f}s")
+        metrics.upstream_retries.inc(host=urlsplit(url).netloc, reason=reason)
+        time.sleep(delay)
+
+    res.raise_for_status()
+    data = response_json(res)
+    qloo_cache.set(key, data, ttl=QLOO_TTLS.get(path))
+    return data
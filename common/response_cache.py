@@ -0,0 +1,96 @@
+# response_cache.py
+import os
+import re
+import time
+import importlib
+from asgiref.sync import sync_to_async
+from common.cache_utils import TTLCache
+from common.agent_registry import aget_agent_executor, aroute_message
+from common import metrics
+from common.metrics_callbacks import METRICS_CONFIG
+from common.session_state import run_degraded
+
+AGENT_RESPONSE_CACHE_SIZE = int(os.getenv("AGENT_RESPONSE_CACHE_SIZE", "1024"))
+AGENT_RESPONSE_CACHE_TTL = int(os.getenv("AGENT_RESPONSE_CACHE_TTL", "1800"))
+
+# Agent name -> "module:function" returning a cheap fingerprint of the user's underlying data
+AGENT_FINGERPRINTS = {
+    "movie": "movie_agent._movie_tools:watched_fingerprint",
+    "couple_movie": "couple_movie_agent.couple_tools:joint_watched_fingerprint",
+    "spotify": "spotify_agent.data_gathering:library_fingerprint",
+}
+
+response_cache = TTLCache(maxsize=AGENT_RESPONSE_CACHE_SIZE, ttl=AGENT_RESPONSE_CACHE_TTL, name="agent_response")
+
+
+def normalize_message(message):
+    """Lower-case, collapse whitespace and drop trailing punctuation so trivially different phrasings share a key."""
+    message = " ".join(message.split()).casefold()
+    return re.sub(r"[\s.!?]+$", "", message)
+
+
+def response_cache_key(agent_name, message):
+    """Cache key for an agent reply, or None when the user's data fingerprint is unavailable.
+
+    The fingerprint (e.g. last-played timestamp, playlist snapshot ids) is part of
+    the key, so cached replies are invalidated as soon as the underlying data changes.
+    Call inside agent_run so fingerprints see the caller's session.
+    """
+    target = AGENT_FINGERPRINTS.get(agent_name)
+    if not target:
+        return None
+    module_name, func_name = target.split(":")
+    try:
+        fingerprint = getattr(importlib.import_module(module_name), func_name)()
+    except Exception as e:
+        print(f"[❌] Fingerprint failed for '{agent_name}' agent: {e}")
+        return None
+    if fingerprint is None:
+        return None
+    return f"{agent_name}|{fingerprint}|{normalize_message(message)}"
+
+
+async def aresponse_cache_key(agent_name, message):
+    """response_cache_key off the event loop, or None for agents whose executor keeps conversation memory.
+
+    A memoryful agent's reply depends on the chat history, and a cache hit would
+    also skip the memory update, so those agents are never cached.
+    """
+    executor = await aget_agent_executor(agent_name)
+    if getattr(executor, "memory", None) is not None:
+        return None
+    return await sync_to_async(response_cache_key, thread_sensitive=False)(agent_name, message)
+
+
+async def ainvoke_with_cache(agent_name, message, default_output=""):
+    """Run an agent, answering repeats from the response cache. Returns (output, served_from_cache).
+
+    Cache misses go through the agent's intent router first and only reach the
+    executor when no fast path matches. Replies from runs where a tool or upstream
+    call failed (see session_state.note_error) are returned but not cached. Call
+    inside agent_run.
+    """
+    start = time.perf_counter()
+    source = "cache"
+    with metrics.agent_requests_in_flight.track_inprogress(agent=agent_name):
+        try:
+            cache_key = await aresponse_cache_key(agent_name, message)
+            cached = response_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cached, True
+
+            source = "router"
+            output = await aroute_message(agent_name, message)
+            if output is None:
+                source = "agent"
+                executor = await aget_agent_executor(agent_name)
+                response = await executor.ainvoke({"input": message}, config=METRICS_CONFIG)
+                output = response.get("output", default_output)
+            if cache_key and output and not run_degraded():
+                response_cache.set(cache_key, output)
+            return output, False
+        except Exception:
+            source = "error"
+            raise
+        finally:
+            metrics.agent_request_seconds.observe(time.perf_counter() - start, agent=agent_name, source=source)
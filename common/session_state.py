@@ -0,0 +1,190 @@
+# session_state.py
+import os
+import time
+import uuid
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from asgiref.sync import sync_to_async
+
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))  # sessions kept in memory
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "1800"))  # seconds before an idle session is dropped
+
+DEFAULT_USER = "default"
+DEFAULT_CONVERSATION = "default"
+CLIENT_ID_SESSION_KEY = "chat_client_id"  # Django session entry holding an anonymous client's id
+
+
+class SessionState:
+    """Per-user, per-conversation scratch space for agent tools (watched history, last recommendations, ...)."""
+
+    def __init__(self, user_id, conversation_id):
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.last_used = time.time()
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+
+
+class SessionStore:
+    """Bounded LRU of SessionState objects with idle eviction."""
+
+    def __init__(self, maxsize=SESSION_MAX, idle_ttl=SESSION_IDLE_TTL):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, conversation_id):
+        key = (str(user_id), str(conversation_id))
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            state = self._sessions.get(key)
+            if state is None:
+                state = SessionState(*key)
+                self._sessions[key] = state
+            state.last_used = now
+            self._sessions.move_to_end(key)
+            return state
+
+    def _evict(self, now):
+        while self._sessions:
+            key, state = next(iter(self._sessions.items()))
+            if len(self._sessions) < self.maxsize and now - state.last_used < self.idle_ttl:
+                break
+            del self._sessions[key]
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+session_store = SessionStore()
+
+_current_session = contextvars.ContextVar("current_session", default=None)
+_run_memo = contextvars.ContextVar("run_memo", default=None)
+_run_freshness = contextvars.ContextVar("run_freshness", default=None)
+_run_errors = contextvars.ContextVar("run_errors", default=None)
+_revalidating = contextvars.ContextVar("revalidating", default=False)
+
+
+@contextmanager
+def agent_run(user_id=DEFAULT_USER, conversation_id=DEFAULT_CONVERSATION):
+    """Bind the caller's session, a fresh tool-result memo, freshness notes and error notes for one agent invocation."""
+    state = session_store.get(user_id, conversation_id)
+    session_token = _current_session.set(state)
+    memo_token = _run_memo.set({})
+    freshness_token = _run_freshness.set({})
+    errors_token = _run_errors.set([])
+    try:
+        yield state
+    finally:
+        _run_errors.reset(errors_token)
+        _run_freshness.reset(freshness_token)
+        _run_memo.reset(memo_token)
+        _current_session.reset(session_token)
+
+
+def current_session():
+    """Session bound by agent_run, or the shared default session for CLI use."""
+    state = _current_session.get()
+    if state is None:
+        state = session_store.get(DEFAULT_USER, DEFAULT_CONVERSATION)
+    return state
+
+
+def note_freshness(source, status, age_seconds):
+    """Record how fresh the data behind ``source`` was for this run ("fresh", "stale" or "live")."""
+    notes = _run_freshness.get()
+    if notes is not None:
+        notes[source] = {"status": status, "age_seconds": round(age_seconds, 1)}
+
+
+def run_freshness():
+    """Freshness notes recorded during the current agent run, for the view's JSON response."""
+    return dict(_run_freshness.get() or {})
+
+
+def note_error(source, error):
+    """Record that ``source`` failed and the current run fell back to partial or placeholder data."""
+    errors = _run_errors.get()
+    if errors is not None:
+        errors.append(f"{source}: {error}")
+
+
+def run_degraded():
+    """True when a tool or upstream call failed during the current agent run, so its reply must not be cached."""
+    return bool(_run_errors.get())
+
+
+@contextmanager
+def revalidating():
+    """Mark the enclosed work as a cache revalidation.
+
+    Shared upstream response caches (qloo_get) fetch again instead of serving their
+    stored copy, so a refresh sees new data. Threads started with submit_in_context
+    inherit the mark.
+    """
+    token = _revalidating.set(True)
+    try:
+        yield
+    finally:
+        _revalidating.reset(token)
+
+
+def is_revalidating():
+    return _revalidating.get()
+
+
+def submit_in_context(pool, fn, *args, **kwargs):
+    """pool.submit that carries the caller's session and run memo into the worker thread."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def run_memoized(fn):
+    """Cache fn's result for the rest of the current agent run, keyed on its arguments."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        memo = _run_memo.get()
+        if memo is None:
+            return fn(*args, **kwargs)
+        key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        if key not in memo:
+            memo[key] = fn(*args, **kwargs)
+        return memo[key]
+    return wrapper
+
+
+def request_session_ids(request, data):
+    """(user_id, conversation_id) for a Django chat request.
+
+    Authenticated users are keyed by primary key, anonymous ones by a random id
+    kept in their Django session; the client may pass ``conversation_id`` to keep
+    several chats apart. The session is not saved here: SessionMiddleware persists
+    the new id with the response, so only first-time anonymous clients cost a
+    session write (none with the signed_cookies engine, see SESSION_ENGINE).
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        user_id = f"user:{user.pk}"
+    else:
+        client_id = request.session.get(CLIENT_ID_SESSION_KEY)
+        if client_id is None:
+            client_id = request.session[CLIENT_ID_SESSION_KEY] = uuid.uuid4().hex
+        user_id = f"session:{client_id}"
+    return user_id, str(data.get("conversation_id") or DEFAULT_CONVERSATION)
+
+
+async def arequest_session_ids(request, data):
+    """Async-view variant of request_session_ids (session lookup touches the database)."""
+    return await sync_to_async(request_session_ids)(request, data)
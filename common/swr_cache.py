@@ -0,0 +1,91 @@
+# swr_cache.py
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from common import metrics
+from common.cache_utils import TTLCache
+from common.session_state import note_freshness, revalidating, submit_in_context
+
+SWR_FRESH_TTL = int(os.getenv("SWR_FRESH_TTL", "600"))  # seconds a result is served as fresh
+SWR_STALE_TTL = int(os.getenv("SWR_STALE_TTL", "3600"))  # further seconds it may be served stale while refreshing
+SWR_CACHE_SIZE = int(os.getenv("SWR_CACHE_SIZE", "256"))
+SWR_WORKERS = int(os.getenv("SWR_WORKERS", "2"))  # background refresh threads shared by every SWR cache
+
+_refresh_pool = ThreadPoolExecutor(max_workers=SWR_WORKERS, thread_name_prefix="swr-refresh")
+
+
+class StaleWhileRevalidate:
+    """Serve the last good result immediately, refreshing it in the background once it goes stale.
+
+    Results younger than ``fresh_ttl`` are served as is. Up to ``stale_ttl`` seconds
+    past that they are still served, and one background refresh per key replaces
+    them. Older entries are gone and the caller recomputes. Every read records its
+    freshness on the current agent run (see session_state.note_freshness).
+    Empty results are never stored, so a failed refresh keeps the last good value.
+    """
+
+    def __init__(self, name, fresh_ttl=SWR_FRESH_TTL, stale_ttl=SWR_STALE_TTL, maxsize=SWR_CACHE_SIZE):
+        self.name = name
+        self.fresh_ttl = fresh_ttl
+        self._entries = TTLCache(maxsize=maxsize, ttl=fresh_ttl + stale_ttl, name=f"swr:{name}")
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, refresh=None):
+        """Stored value for ``key`` or None; a stale hit schedules ``refresh()`` in the background."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.time() - entry["stored_at"]
+        if age < self.fresh_ttl:
+            self._note("fresh", age)
+        else:
+            self._note("stale", age)
+            if refresh is not None:
+                self._schedule_refresh(key, refresh)
+        return entry["value"]
+
+    def put(self, key, value):
+        if value:
+            self._entries.set(key, {"value": value, "stored_at": time.time()})
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, refresh=compute)
+        if value is not None:
+            return value
+        value = compute()
+        self.put(key, value)
+        self.note_live()
+        return value
+
+    def note_live(self):
+        """Record that this run computed the value itself, for callers that bypass get_or_compute."""
+        self._note("live", 0.0)
+
+    def _note(self, status, age):
+        metrics.swr_lookups.inc(cache=self.name, status=status)
+        note_freshness(self.name, status, age)
+
+    def _schedule_refresh(self, key, compute):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        submit_in_context(_refresh_pool, self._refresh, key, compute)
+
+    def _refresh(self, key, compute):
+        try:
+            with revalidating():
+                self.put(key, compute())
+            metrics.swr_refreshes.inc(cache=self.name, status="ok")
+            print(f"[🔄] Refreshed stale '{self.name}' entry in the background")
+        except Exception as e:
+            metrics.swr_refreshes.inc(cache=self.name, status="error")
+            print(f"[❌] Background refresh of '{self.name}' failed, keeping the stale value: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
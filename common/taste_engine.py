@@ -0,0 +1,138 @@
+# taste_engine.py
+import os
+import numpy as np
+
+TASTE_HALF_LIFE = float(os.getenv("TASTE_HALF_LIFE", "50"))  # watched items until a title's weight halves
+TASTE_DECADE_WEIGHT = float(os.getenv("TASTE_DECADE_WEIGHT", "0.5"))  # decade features relative to genres
+TASTE_RERANK_WEIGHT = float(os.getenv("TASTE_RERANK_WEIGHT", "0.7"))  # cosine vs upstream rank in the final score
+
+
+def genre_key(genre):
+    """Shared vocabulary key for Emby genre names and Qloo genre tags ("Science Fiction" == "science_fiction")."""
+    return " ".join(genre.replace("_", " ").replace("-", " ").split()).casefold()
+
+
+def _decade_key(year):
+    try:
+        return f"decade:{int(year) // 10 * 10}"
+    except (TypeError, ValueError):
+        return None
+
+
+def _features(movie, genre_field, year_field):
+    genres = movie.get(genre_field) or []
+    keys = [genre_key(g) for g in genres if isinstance(g, str) and g.strip()]
+    return keys, _decade_key(movie.get(year_field))
+
+
+class TasteVector:
+    """Recency-weighted genre + decade profile of a watch history.
+
+    ``watched`` is expected most recent first (Emby's DatePlayed descending); item i
+    gets weight 0.5 ** (i / half_life). Pass half_life=None to weigh every title equally.
+    """
+
+    def __init__(self, watched, half_life=TASTE_HALF_LIFE, genre_field="Genres", year_field="Year"):
+        self.vocab = {}
+        self.labels = {}
+        rows = []
+        for movie in watched:
+            keys, decade = _features(movie, genre_field, year_field)
+            for label in movie.get(genre_field) or []:
+                if isinstance(label, str) and label.strip():
+                    self.labels.setdefault(genre_key(label), label)
+            rows.append((keys, decade))
+            for key in keys + ([decade] if decade else []):
+                self.vocab.setdefault(key, len(self.vocab))
+
+        n = len(rows)
+        if half_life:
+            weights = np.power(0.5, np.arange(n, dtype=np.float64) / half_life)
+        else:
+            weights = np.ones(n, dtype=np.float64)
+        self.vector = self._encode_rows(rows).T @ weights if n else np.zeros(len(self.vocab))
+
+    @classmethod
+    def from_weights(cls, genre_weights, decade_weights=None):
+        """Profile from precomputed sums: genre label -> weight and decade ("1990") -> weight."""
+        profile = cls([])
+        weights = []
+        for label, weight in genre_weights.items():
+            key = genre_key(label)
+            profile.labels.setdefault(key, label)
+            weights.append((profile.vocab.setdefault(key, len(profile.vocab)), weight))
+        for decade, weight in (decade_weights or {}).items():
+            key = _decade_key(decade)
+            if key:
+                weights.append((profile.vocab.setdefault(key, len(profile.vocab)), weight * TASTE_DECADE_WEIGHT))
+        profile.vector = np.zeros(len(profile.vocab), dtype=np.float64)
+        for col, weight in weights:
+            profile.vector[col] += weight
+        return profile
+
+    def _encode_rows(self, rows):
+        """One row per movie: genres share 1.0, the decade adds TASTE_DECADE_WEIGHT. Unknown keys are dropped."""
+        matrix = np.zeros((len(rows), len(self.vocab)), dtype=np.float64)
+        for i, (keys, decade) in enumerate(rows):
+            cols = [self.vocab[k] for k in keys if k in self.vocab]
+            if cols:
+                matrix[i, cols] = 1.0 / len(cols)
+            if decade in self.vocab:
+                matrix[i, self.vocab[decade]] = TASTE_DECADE_WEIGHT
+        return matrix
+
+    def encode(self, movies, genre_field="genres", year_field="year"):
+        return self._encode_rows([_features(m, genre_field, year_field) for m in movies])
+
+    def similarity(self, movies, genre_field="genres", year_field="year"):
+        """Cosine similarity of each movie to the profile, as one matrix-vector product."""
+        if not movies:
+            return np.zeros(0)
+        matrix = self.encode(movies, genre_field, year_field)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(self.vector)
+        dots = matrix @ self.vector
+        return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+    def top_genres(self, k):
+        """Top-k (genre label, share of the top-k weight) by recency-weighted preference."""
+        genres = [(key, col) for key, col in self.vocab.items() if not key.startswith("decade:")]
+        if not genres:
+            return []
+        weights = self.vector[[col for _, col in genres]]
+        order = np.argsort(-weights, kind="stable")[:max(1, k)]
+        total = weights[order].sum()
+        return [(self.labels[genres[i][0]], float(weights[i] / total) if total else 0.0) for i in order]
+
+
+def rerank(watched, candidates, limit=None, half_life=TASTE_HALF_LIFE):
+    """Order candidates by taste similarity blended with their upstream rank; sets ``taste_score``.
+
+    ``watched`` is a watch history or an already built TasteVector.
+    Candidates keep a fused ``score`` when they have one (Qloo rank fusion), else
+    their list position is the prior. Those without genres fall back to the prior alone.
+    """
+    if not candidates:
+        return []
+    if isinstance(watched, TasteVector):
+        profile = watched
+    elif watched:
+        profile = TasteVector(watched, half_life=half_life)
+    else:
+        profile = None
+    if profile is None or not profile.vocab:
+        return candidates[:limit] if limit else candidates
+
+    similarity = profile.similarity(candidates)
+    n = len(candidates)
+    prior = np.array([m.get('score') or 0.0 for m in candidates], dtype=np.float64)
+    if prior.max() > 0:
+        prior = prior / prior.max()
+    else:
+        prior = 1.0 - np.arange(n, dtype=np.float64) / n
+    final = TASTE_RERANK_WEIGHT * similarity + (1 - TASTE_RERANK_WEIGHT) * prior
+
+    for movie, score in zip(candidates, final):
+        movie['taste_score'] = float(score)
+    order = np.argsort(-final, kind="stable")
+    ranked = [candidates[i] for i in order]
+    return ranked[:limit] if limit else ranked
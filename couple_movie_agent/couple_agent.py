@@ -1,19 +1,13 @@
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
-from .couple_tools import fetch_joint_watched_movies, recommend_couple_movies, summarize_couple_taste
+from .couple_tools import fetch_joint_watched_movies, recommend_couple_movies, summarize_couple_taste, recommend_and_summarize_couple_movies
 import os
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
-llm = ChatGoogleGenerativeAI(
-    model="models/gemini-1.5-flash",
-    google_api_key=os.getenv("GEMINI_API_KEY"),
-    temperature=0.6,
-)
-
-tools = [fetch_joint_watched_movies, recommend_couple_movies, summarize_couple_taste]
+tools = [fetch_joint_watched_movies, recommend_couple_movies, summarize_couple_taste, recommend_and_summarize_couple_movies]
 
 prompt = ChatPromptTemplate.from_messages([
     (
@@ -22,17 +16,15 @@ prompt = ChatPromptTemplate.from_messages([
 You can suggest movies for couples based on their shared watch history on Emby.
 
 **Workflow Instructions:**
-1. If the user asks for movie recommendations or couple taste analysis:
-   - First call `fetch_joint_watched_movies` to get combined Emby history.
-   - Then call `recommend_couple_movies` to fetch Qloo-based recommendations.
-   - Finally, call `summarize_couple_taste` to explain why those movies match their preferences.
+1. If the user asks for movie recommendations:
+   - Call `recommend_and_summarize_couple_movies` once. It fetches the combined Emby history,
+     gets Qloo-based recommendations and explains why they match the couple's preferences.
+   - Present its output exactly as returned; it is already formatted under **Recommended Movies:**.
 
-2. Do not ask the user for watched movies — fetch them automatically from Emby.
-Always use the tools in the order above when asked for recommendations.
+2. If the user only asks about their shared history or taste, use `fetch_joint_watched_movies`
+   or `summarize_couple_taste` on their own.
 
-Present results under a heading:
-**Recommended Movies:**
-<list of markdown-formatted movie recommendations>
+3. Do not ask the user for watched movies — fetch them automatically from Emby.
 
 Engage naturally otherwise.
 """
@@ -41,10 +33,18 @@ Engage naturally otherwise.
     ("placeholder", "{agent_scratchpad}")
 ])
 
-agent = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+def build_agent_executor():
+    """Build the couple AgentExecutor. Called lazily by common.agent_registry."""
+    llm = ChatGoogleGenerativeAI(
+        model="models/gemini-1.5-flash",
+        google_api_key=os.getenv("GEMINI_API_KEY"),
+        temperature=0.6,
+    )
+    agent = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
+    return AgentExecutor(agent=agent, tools=tools, verbose=True)
 
 if __name__ == "__main__":
+    agent_executor = build_agent_executor()
     question = "Can you suggest some good movies for us to watch together?"
     result = agent_executor.invoke({"input": question})
     print("\n🎬 Couple Agent Response:\n", result["output"])
@@ -1,15 +1,19 @@
-import requests
+from common import http_utils
+from common.emby_query import item_query
+from common.json_utils import response_json
+from common.session_state import note_error
 import json
 
 def get_user_id(server, api_key, username):
     try:
-        res = requests.get(f"{server}/Users", params={'api_key': api_key})
-        users = res.json()
+        res = http_utils.get(f"{server}/Users", params={'api_key': api_key})
+        users = response_json(res)
         for user in users:
             if user['Name'].lower() == username.lower():
                 return user['Id']
     except Exception as e:
         print("[❌] USER_ID fetch failed:", e)
+        note_error("emby_user", e)
     return None
 
 def get_watched_movies(server, api_key, user_id):
@@ -20,11 +24,11 @@ def get_watched_movies(server, api_key, user_id):
             'Recursive': 'true',
             'SortBy': 'DatePlayed',
             'Filters': 'IsPlayed',
-            'Fields': 'Genres',
-            'api_key': api_key
+            'api_key': api_key,
+            **item_query('Genres'),
         }
-        res = requests.get(url, params=params)
-        data = res.json().get("Items", [])
+        res = http_utils.get(url, params=params)
+        data = response_json(res).get("Items", [])
         return [{
             "Name": m.get("Name"),
             "Genres": m.get("Genres", []),
@@ -33,4 +37,25 @@ def get_watched_movies(server, api_key, user_id):
         } for m in data]
     except Exception as e:
         print("[❌] Error fetching watched movies:", e)
+        note_error("emby_watched", e)
         return []
+
+
+def get_watched_fingerprint(server, api_key, user_id):
+    """Played count plus the most recent play; changes whenever the user's history does."""
+    params = {
+        'IncludeItemTypes': 'Movie',
+        'Recursive': 'true',
+        'SortBy': 'DatePlayed',
+        'SortOrder': 'Descending',
+        'Filters': 'IsPlayed',
+        'Limit': 1,
+        'api_key': api_key,
+        **item_query(user_data=True),
+    }
+    res = http_utils.get(f"{server}/Users/{user_id}/Items", params=params)
+    res.raise_for_status()
+    data = response_json(res)
+    items = data.get("Items", [])
+    latest = items[0] if items else {}
+    return f"{data.get('TotalRecordCount', 0)}:{latest.get('Id', '')}:{latest.get('UserData', {}).get('LastPlayedDate', '')}"
@@ -1,23 +1,46 @@
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
+from common.llm_cache import llm_cache, llm_cache_key
+from common import metrics
+from common.session_state import note_error
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-model = genai.GenerativeModel("models/gemini-1.5-flash")
+MODEL_NAME = "models/gemini-1.5-flash"
+_model = None
+
+def _get_model():
+    global _model
+    if _model is None:
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
 
 def explain_recommendations(watched_titles, recommended_titles):
     if not watched_titles or not recommended_titles:
         return "No watched or recommended titles provided."
 
+    key = llm_cache_key(MODEL_NAME, "couple_taste", watched=watched_titles[:5], recommended=recommended_titles[:5])
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+
     prompt = (
         f"User 1 and User 2 watched: {', '.join(watched_titles[:5])}.\n"
         f"Recommended movies: {', '.join(recommended_titles[:5])}.\n"
         "Explain why these suggestions match their shared preferences."
     )
     try:
-        res = model.generate_content(prompt)
-        return getattr(res, "text", "[❌] Gemini error")
+        with metrics.llm_seconds.time(model=MODEL_NAME):
+            res = _get_model().generate_content(prompt)
+        metrics.record_genai_usage(MODEL_NAME, res)
+        text = getattr(res, "text", None)
+        if text is None:
+            note_error("gemini", "empty response")
+            return "[❌] Gemini error"
+        llm_cache.set(key, text)
+        return text
     except Exception as e:
+        note_error("gemini", e)
         return f"[ERROR] Gemini failed: {e}"
@@ -1,12 +1,7 @@
-import os
-import requests
-
-def get_qloo_recommendations(genre_urn=None, year_min=2022, location_query=None):
-    url = "https://hackathon.api.qloo.com/v2/insights"
-    headers = {
-        "x-api-key": os.getenv("QLOO_API_KEY")
-    }
+from common.qloo_utils import qloo_get
+from common.session_state import note_error
 
+def get_qloo_recommendations(genre_urn=None, year_min=2022, location_query=None, take=None):
     params = {
         "filter.type": "urn:entity:movie",
         "filter.release_year.min": year_min
@@ -15,14 +10,21 @@ def get_qloo_recommendations(genre_urn=None, year_min=2022, location_query=None)
         params["filter.tags"] = genre_urn
     if location_query:
         params["signal.location.query"] = location_query
+    if take:
+        params["take"] = take
 
     try:
-        res = requests.get(url, headers=headers, params=params)
-        entities = res.json().get("results", {}).get("entities", [])
+        entities = qloo_get("/v2/insights", params).get("results", {}).get("entities", [])
         return [
-            {"name": e.get("name"), "image_url": e.get("properties", {}).get("image", {}).get("url")}
+            {
+                "name": e.get("name"),
+                "image_url": e.get("properties", {}).get("image", {}).get("url"),
+                "year": e.get("properties", {}).get("release_year"),
+                "genres": [t.get("name") for t in e.get("tags", []) if str(t.get("type", "")).startswith("urn:tag:genre") and t.get("name")],
+            }
             for e in entities if e.get("name")
         ]
     except Exception as e:
         print("[❌] Qloo API Error:", e)
+        note_error("qloo", e)
         return []
@@ -1,62 +1,94 @@
 from langchain.tools import tool
-from .couple_emby_utils import get_user_id, get_watched_movies
+from .couple_emby_utils import get_user_id, get_watched_movies, get_watched_fingerprint
 from .couple_qloo_utils import get_qloo_recommendations
 from .couple_gemini_utils import explain_recommendations
+from common.session_state import current_session, run_memoized
+from common.taste_engine import TasteVector, rerank
+from common.swr_cache import StaleWhileRevalidate
 import os
 from dotenv import load_dotenv
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 EMBY_SERVER = os.getenv("EMBY_SERVER")
 EMBY_API_KEY = os.getenv("EMBY_API_KEY")
 USER_NAME_1 = os.getenv("EMBY_USER")
 USER_NAME_2 = os.getenv("EMBY_USER_2")
+QLOO_CANDIDATES = int(os.getenv("QLOO_CANDIDATES", "50"))  # candidates fetched before local reranking
+RECOMMEND_LIMIT = int(os.getenv("RECOMMEND_LIMIT", "10"))  # recommendations kept after reranking
 
-watched_cache = []
+recommendation_cache = StaleWhileRevalidate("couple_recommendations")
 
+@run_memoized
 def _fetch_joint_movies():
     if not EMBY_SERVER or not EMBY_API_KEY or not USER_NAME_1 or not USER_NAME_2:
         return []
 
-    user_id_1 = get_user_id(EMBY_SERVER, EMBY_API_KEY, USER_NAME_1)
-    user_id_2 = get_user_id(EMBY_SERVER, EMBY_API_KEY, USER_NAME_2)
+    def fetch_user(user_name):
+        user_id = get_user_id(EMBY_SERVER, EMBY_API_KEY, user_name)
+        if not user_id:
+            return None
+        return get_watched_movies(EMBY_SERVER, EMBY_API_KEY, user_id)
 
-    if not user_id_1 or not user_id_2:
-        return []
+    # Both histories are independent, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        watched_1, watched_2 = pool.map(fetch_user, (USER_NAME_1, USER_NAME_2))
 
-    watched_1 = get_watched_movies(EMBY_SERVER, EMBY_API_KEY, user_id_1)
-    watched_2 = get_watched_movies(EMBY_SERVER, EMBY_API_KEY, user_id_2)
+    if watched_1 is None or watched_2 is None:
+        return []
 
     return watched_1 + watched_2
 
+def joint_watched_fingerprint():
+    """Fingerprint of both users' watch histories, used to key cached agent responses."""
+    if not EMBY_SERVER or not EMBY_API_KEY or not USER_NAME_1 or not USER_NAME_2:
+        return None
+    user_ids = [get_user_id(EMBY_SERVER, EMBY_API_KEY, name) for name in (USER_NAME_1, USER_NAME_2)]
+    if not all(user_ids):
+        return None
+    return "|".join(get_watched_fingerprint(EMBY_SERVER, EMBY_API_KEY, user_id) for user_id in user_ids)
+
+def _session_watched(session):
+    watched = session.get("watched")
+    if not watched:
+        watched = _fetch_joint_movies()
+        session.set("watched", watched)
+    return watched
+
 def _get_top_genre(movies):
-    genres = []
-    for m in movies:
-        genres.extend(m.get("Genres", []))
-    if not genres:
+    # The joint history is two concatenated lists, so every title weighs the same
+    top = TasteVector(movies, half_life=None).top_genres(1)
+    if not top:
         return "urn:tag:genre:media:drama"
-    top_genre = Counter(genres).most_common(1)[0][0].lower().replace(" ", "_")
+    top_genre = top[0][0].lower().replace(" ", "_")
     return f"urn:tag:genre:media:{top_genre}"
 
+def _recommend(watched):
+    """Over-fetch Qloo candidates for the top genre and rerank them against the joint taste vector."""
+    candidates = get_qloo_recommendations(genre_urn=_get_top_genre(watched), take=QLOO_CANDIDATES)
+    return rerank(watched, candidates, limit=RECOMMEND_LIMIT, half_life=None)
+
+def _cached_recommend(session):
+    """_recommend for the configured couple, served stale-while-revalidate."""
+    key = f"{USER_NAME_1}|{USER_NAME_2}".casefold()
+    cached = recommendation_cache.get(key, refresh=lambda: _recommend(_fetch_joint_movies()))
+    if cached is not None:
+        return cached
+    qloo_results = _recommend(_session_watched(session))
+    recommendation_cache.put(key, qloo_results)
+    recommendation_cache.note_live()
+    return qloo_results
+
 @tool
 def fetch_joint_watched_movies(input) -> list:
     """Fetch combined watched movies of both users"""
-    global watched_cache
-    watched_cache = _fetch_joint_movies()
-    return [{"Name": m["Name"], "Genres": m.get("Genres", [])} for m in watched_cache]
-
-@tool
-def recommend_couple_movies(input) -> list:
-    """Recommend movies for the couple based on shared watched history"""
-    global watched_cache
-    if not watched_cache:
-        watched_cache = _fetch_joint_movies()
+    watched = _fetch_joint_movies()
+    current_session().set("watched", watched)
+    return [{"Name": m["Name"], "Genres": m.get("Genres", [])} for m in watched]
 
-    genre_urn = _get_top_genre(watched_cache)
-
-    qloo_results = get_qloo_recommendations(genre_urn=genre_urn)
+def _format_recommendations(movies):
     formatted = []
-    for movie in qloo_results:
+    for movie in movies:
         name = movie.get("name")
         image = movie.get("image_url")
         if image:
@@ -65,12 +97,46 @@ def recommend_couple_movies(input) -> list:
             formatted.append(f"* **{name}**")
     return formatted
 
+def couple_recommendation_pipeline():
+    """Joint history -> Qloo candidates -> Gemini explanation. Returns (formatted, summary).
+
+    A cached recommendation list skips the Qloo call; the joint history is still
+    needed for the explanation and comes from the session when already fetched.
+    """
+    session = current_session()
+    qloo_results = _cached_recommend(session)
+    session.set("recommended", qloo_results)
+    if not qloo_results:
+        return [], None
+
+    watched = _session_watched(session)
+    summary = explain_recommendations(
+        [m["Name"] for m in watched][:5], [m.get("name") for m in qloo_results][:5]
+    )
+    return _format_recommendations(qloo_results), summary
+
+@tool
+def recommend_couple_movies(input) -> list:
+    """Recommend movies for the couple based on shared watched history"""
+    session = current_session()
+    qloo_results = _cached_recommend(session)
+    session.set("recommended", qloo_results)
+    return _format_recommendations(qloo_results)
+
 @tool
 def summarize_couple_taste(input) -> str:
     """Summarize shared movie taste of the couple"""
-    global watched_cache
-    if not watched_cache:
-        watched_cache = _fetch_joint_movies()
-    watched_titles = [m["Name"] for m in watched_cache]
-    recommended_titles = [m.get("name") for m in get_qloo_recommendations()]
+    session = current_session()
+    watched_titles = [m["Name"] for m in _session_watched(session)]
+    recommended = session.get("recommended") or get_qloo_recommendations()
+    recommended_titles = [m.get("name") for m in recommended]
     return explain_recommendations(watched_titles[:5], recommended_titles[:5])
+
+@tool
+def recommend_and_summarize_couple_movies(input) -> str:
+    """Fetch both users' history, recommend movies and explain why they suit the couple, in one step. Returns the complete answer."""
+    formatted, summary = couple_recommendation_pipeline()
+    if not formatted:
+        return "I couldn't find any movies for the two of you right now. Would you like to try again later?"
+    answer = "**Recommended Movies:**\n" + "\n".join(formatted)
+    return answer + "\n\n" + summary if summary else answer
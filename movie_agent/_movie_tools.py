@@ -2,10 +2,15 @@
 import os
 from typing import List
 from langchain.tools import tool
-from .emby_utils import get_user_id, get_watched_movies, get_qloo_recommendations, get_trending_movies, get_recent_movies, get_movie_details
+from .emby_utils import get_user_id, get_watched_movies, get_watched_fingerprint, get_qloo_recommendations, get_trending_movies, get_recent_movies, get_movie_details
+from .emby_library import get_library
 from .gemini_utils import explain_recommendations
+from .taste_profile import load_profile, profile_vector
+from common.taste_engine import TasteVector, rerank
+from common.session_state import current_session, note_error, run_memoized, submit_in_context
+from common.swr_cache import StaleWhileRevalidate
 from dotenv import load_dotenv
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 dotenv_path = os.path.join(script_dir, '.env')
@@ -15,11 +20,16 @@ EMBY_SERVER = os.getenv("EMBY_SERVER")
 EMBY_API_KEY = os.getenv("EMBY_API_KEY")
 USER_NAME = os.getenv("EMBY_USER")
 USER_LOCATION = os.getenv("USER_LOCATION", "India")  # loaded from .env
+EMBY_ENRICH_WORKERS = int(os.getenv("EMBY_ENRICH_WORKERS", "8"))  # max concurrent Emby lookups
+QLOO_TOP_GENRES = int(os.getenv("QLOO_TOP_GENRES", "3"))  # genres queried in parallel for general recommendations
+QLOO_LOCATION_WEIGHT = float(os.getenv("QLOO_LOCATION_WEIGHT", "0.5"))  # fusion weight of the location query
+QLOO_CANDIDATES = int(os.getenv("QLOO_CANDIDATES", "50"))  # candidates fetched per Qloo query before local reranking
+RECOMMEND_LIMIT = int(os.getenv("RECOMMEND_LIMIT", "10"))  # recommendations kept after reranking
+RRF_K = 60  # rank-fusion damping constant
 
-# Cache
-watched_cache = []
-recommended_cache = []
+recommendation_cache = StaleWhileRevalidate("movie_recommendations")
 
+@run_memoized
 def _fetch_movies():
     if not all([EMBY_SERVER, EMBY_API_KEY, USER_NAME]):
         return {"error": "EMBY_SERVER, EMBY_API_KEY, and USER_NAME must be set in the .env file."}
@@ -31,92 +41,140 @@ def _fetch_movies():
     movies = get_watched_movies(EMBY_SERVER, EMBY_API_KEY, user_id)
     return movies
 
-def _get_top_genre(movies: List[dict]) -> str:
-    genre_list = []
-    for movie in movies:
-        genres = movie.get("Genres", [])
-        if isinstance(genres, list):
-            genre_list.extend(genres)
+def watched_fingerprint():
+    """Fingerprint of the user's Emby watch history, used to key cached agent responses."""
+    if not all([EMBY_SERVER, EMBY_API_KEY, USER_NAME]):
+        return None
+    user_id = get_user_id(EMBY_SERVER, EMBY_API_KEY, USER_NAME)
+    if not user_id:
+        return None
+    return get_watched_fingerprint(EMBY_SERVER, EMBY_API_KEY, user_id)
+
+@run_memoized
+def _fetch_profile():
+    """The user's persistent taste profile, synced incrementally instead of downloading the whole history."""
+    if not all([EMBY_SERVER, EMBY_API_KEY, USER_NAME]):
+        return {"error": "EMBY_SERVER, EMBY_API_KEY, and USER_NAME must be set in the .env file."}
+    user_id = get_user_id(EMBY_SERVER, EMBY_API_KEY, USER_NAME)
+    if not user_id:
+        print("[ERROR] Could not fetch user ID.")
+        return None
+    return load_profile(EMBY_SERVER, EMBY_API_KEY, user_id)
+
+def _profile_vector(profile) -> TasteVector:
+    if not profile or 'error' in profile:
+        return TasteVector([])
+    return profile_vector(profile)
 
-    if not genre_list:
+def _get_top_genres(taste: TasteVector, k: int = QLOO_TOP_GENRES) -> List[tuple]:
+    """Top-k genre URNs of the recency-weighted taste vector, each with its share of the top-k weight."""
+    top = taste.top_genres(k)
+    if not top:
         print("[❌] No genres found in Emby data.")
-        return "urn:tag:genre:media:drama"  # fallback genre
+        return [("urn:tag:genre:media:drama", 1.0)]  # fallback genre
+
+    return [
+        (f"urn:tag:genre:media:{genre.lower().replace(' ', '_')}", share)
+        for genre, share in top
+    ]
+
+def _fuse_rankings(ranked_lists: List[tuple]) -> List[dict]:
+    """Weighted reciprocal-rank fusion of (weight, movies) lists, deduplicated by name."""
+    scores = {}
+    fused = {}
+    for weight, movies in ranked_lists:
+        for rank, movie in enumerate(movies):
+            if not isinstance(movie, dict) or 'name' not in movie:
+                continue
+            name = movie['name']
+            scores[name] = scores.get(name, 0.0) + weight / (RRF_K + rank + 1)
+            fused.setdefault(name, movie)
+    for name, movie in fused.items():
+        movie['score'] = scores[name]
+    return sorted(fused.values(), key=lambda m: m['score'], reverse=True)
+
+def _enrich_movie(movie: dict) -> dict:
+    try:
+        details = get_movie_details(EMBY_SERVER, EMBY_API_KEY, movie['name'])
+        movie['genres'] = details.get('Genres') or movie.get('genres', [])
+    except Exception as e:
+        print(f"[❌] Enrichment failed for '{movie.get('name')}': {e}")
+        note_error("emby_details", e)
+        movie.setdefault('genres', [])
+    return movie
+
+def _enrich_movies(movies: List[dict]) -> List[dict]:
+    """Enrich Qloo results with Emby genres, keeping input order and Qloo's genres when Emby has none.
 
-    top_genre = Counter(genre_list).most_common(1)[0][0].lower().replace(" ", "_")
-    return f"urn:tag:genre:media:{top_genre}"
+    Matches against the local library mirror; only if the mirror cannot be synced
+    does it fall back to live searches, EMBY_ENRICH_WORKERS at a time.
+    """
+    if not movies:
+        return []
+    library = get_library(EMBY_SERVER, EMBY_API_KEY)
+    if library.ensure_fresh():
+        for movie in movies:
+            try:
+                match = library.lookup(movie['name'], movie.get('year'))
+            except Exception as e:
+                print(f"[❌] Library lookup failed for '{movie.get('name')}': {e}")
+                note_error("emby_library", e)
+                match = None
+            movie['genres'] = (match['Genres'] if match else None) or movie.get('genres', [])
+            movie['in_library'] = match is not None
+        return movies
+    workers = max(1, min(EMBY_ENRICH_WORKERS, len(movies)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_enrich_movie, movies))
 
 @tool
 def fetch_watched_movies() -> List[dict]:
     """Fetch the recently watched movies from Emby."""
-    global watched_cache
-    watched_cache = _fetch_movies()
-    if isinstance(watched_cache, dict) and 'error' in watched_cache:
-        return watched_cache
-    return [{"Name": m["Name"], "Genres": m["Genres"]} for m in watched_cache]
+    watched = _fetch_movies()
+    if isinstance(watched, dict) and 'error' in watched:
+        return watched
+    return [{"Name": m["Name"], "Genres": m["Genres"]} for m in watched]
 
-@tool
-def recommend_movies(genre: str = None, language: str = None) -> List[str]:
-    """
-    Recommend movies using Qloo, then enrich with genre data from Emby.
-    Can be filtered by genre (e.g., "comedy", "drama") and language (e.g., "english", "french").
-    If no genre or language is specified, it provides general recommendations based on taste and location.
-    """
-    global watched_cache, recommended_cache
-    if not watched_cache:
-        watched_cache = _fetch_movies()
+def _fetch_candidates(pool, profile_future, genre: str = None, language: str = None) -> List[dict]:
+    """Qloo candidates for a request, reranked against the user's taste vector.
 
-    qloo_recs = []
+    Each query over-fetches QLOO_CANDIDATES results; the location-based query is
+    submitted before waiting on the taste profile, so it runs concurrently with its
+    Emby sync, and the taste queries follow once the top genres are known. The merged
+    list is scored locally and cut to RECOMMEND_LIMIT.
+    """
     # If a specific genre or language is requested, only fetch based on that.
     if genre or language:
         genre_urn = f"urn:tag:genre:media:{genre.lower().replace(' ', '_')}" if genre else None
         print(f"[🎯] Fetching specific recommendations. Genre: {genre_urn}, Language: {language}")
-        qloo_recs = get_qloo_recommendations(
-            genre_urn=genre_urn,
-            year_min=2020,
-            language=language
-        )
+        candidates = get_qloo_recommendations(genre_urn=genre_urn, year_min=2020, language=language, take=QLOO_CANDIDATES)
+        taste = _profile_vector(profile_future.result())
     # Otherwise, get general recommendations.
     else:
-        genre_urn = _get_top_genre(watched_cache)
         location = USER_LOCATION
-        print(f"[🎯] Fetching general recommendations. Top Genre: {genre_urn}, Location: {location}")
-        
-        # Step 1: Fetch taste-based recommendations
-        taste_based = get_qloo_recommendations(
-            genre_urn=genre_urn,
-            year_min=2020
+        location_future = submit_in_context(
+            pool, get_qloo_recommendations, genre_urn=None, year_min=2020, location_query=location, take=QLOO_CANDIDATES
         )
+        taste = _profile_vector(profile_future.result())
+        top_genres = _get_top_genres(taste)
+        print(f"[🎯] Fetching general recommendations. Top Genres: {[urn for urn, _ in top_genres]}, Location: {location}")
 
-        # Step 2: Fetch location-based recommendations
-        location_based = get_qloo_recommendations(
-            genre_urn=None,
-            year_min=2020,
-            location_query=location
-        )
-        
-        # Step 3: Merge while preserving order & deduplication
-        seen = set()
-        merged = []
-        for movie in taste_based + location_based:
-            if isinstance(movie, dict) and 'name' in movie:
-                movie_name = movie['name']
-                if movie_name not in seen:
-                    seen.add(movie_name)
-                    merged.append(movie)
-        qloo_recs = merged
-
-    # Enrich with genre data from Emby
-    enriched_recs = []
-    for movie in qloo_recs:
-        details = get_movie_details(EMBY_SERVER, EMBY_API_KEY, movie['name'])
-        movie['genres'] = details.get('Genres', [])
-        enriched_recs.append(movie)
+        # Taste-based queries for each top genre, in parallel with each other and the location query
+        genre_futures = [
+            (share, submit_in_context(pool, get_qloo_recommendations, genre_urn=urn, year_min=2020, take=QLOO_CANDIDATES))
+            for urn, share in top_genres
+        ]
+        ranked_lists = [(share, future.result()) for share, future in genre_futures]
+        ranked_lists.append((QLOO_LOCATION_WEIGHT, location_future.result()))
+
+        # Merge by weighted rank fusion, deduplicating by name
+        candidates = _fuse_rankings(ranked_lists)
 
-    recommended_cache = enriched_recs
-    
-    # Format the output
+    return rerank(taste, candidates, limit=RECOMMEND_LIMIT)
+
+def _format_recommendations(movies: List[dict]) -> List[str]:
     formatted_recommendations = []
-    for movie in enriched_recs:
+    for movie in movies:
         movie_name = movie.get('name')
         image_url = movie.get('image_url')
         genres = ", ".join(movie.get('genres', []))
@@ -124,22 +182,96 @@ def recommend_movies(genre: str = None, language: str = None) -> List[str]:
             formatted_recommendations.append(f"* **{movie_name}** ([Image URL]({image_url})) (Genres: {genres})")
         else:
             formatted_recommendations.append(f"* **{movie_name}** (Genres: {genres})")
-            
     return formatted_recommendations
 
+def _recommendation_key(genre: str = None, language: str = None) -> str:
+    return "|".join(str(part or "").casefold() for part in (USER_NAME, genre, language))
+
+def _compute_recommendations(genre: str = None, language: str = None) -> List[dict]:
+    """Reranked and Emby-enriched recommendations; what recommendation_cache stores and refreshes."""
+    with ThreadPoolExecutor(max_workers=QLOO_TOP_GENRES + 2) as pool:
+        profile_future = submit_in_context(pool, _fetch_profile)
+        qloo_recs = _fetch_candidates(pool, profile_future, genre, language)
+    return _enrich_movies(qloo_recs)
+
+def recommendation_pipeline(genre: str = None, language: str = None) -> tuple:
+    """Taste profile -> Qloo candidates -> (enrichment || Gemini explanation) as one dependency graph.
+
+    Returns (formatted recommendations, taste summary). The summary is None when the
+    watch history is unavailable, and an error string if it is misconfigured.
+    A cached recommendation list (fresh or stale) skips the Qloo and enrichment
+    steps; a stale one is recomputed in the background.
+    """
+    session = current_session()
+    key = _recommendation_key(genre, language)
+    cached = recommendation_cache.get(key, refresh=lambda: _compute_recommendations(genre, language))
+    with ThreadPoolExecutor(max_workers=QLOO_TOP_GENRES + 3) as pool:
+        profile_future = submit_in_context(pool, _fetch_profile)
+        if cached is not None:
+            candidates = cached
+        else:
+            candidates = _fetch_candidates(pool, profile_future, genre, language)
+        profile = profile_future.result()
+
+        # The explanation only needs candidate titles, so it runs alongside enrichment
+        summary_future = None
+        if profile and profile.get('recent_titles') and candidates:
+            summary_future = submit_in_context(
+                pool, explain_recommendations, profile['recent_titles'], [m['name'] for m in candidates]
+            )
+        if cached is not None:
+            enriched_recs = cached
+        else:
+            enriched_recs = _enrich_movies(candidates)
+            recommendation_cache.put(key, enriched_recs)
+            recommendation_cache.note_live()
+        session.set("recommended", enriched_recs)
+
+        if profile and 'error' in profile:
+            summary = profile['error']
+        else:
+            summary = summary_future.result() if summary_future else None
+    return _format_recommendations(enriched_recs), summary
+
+@tool
+def recommend_movies(genre: str = None, language: str = None) -> List[str]:
+    """
+    Recommend movies using Qloo, then enrich with genre data from Emby.
+    Can be filtered by genre (e.g., "comedy", "drama") and language (e.g., "english", "french").
+    If no genre or language is specified, it provides general recommendations based on taste and location.
+    """
+    session = current_session()
+    enriched_recs = recommendation_cache.get_or_compute(
+        _recommendation_key(genre, language), lambda: _compute_recommendations(genre, language)
+    )
+    session.set("recommended", enriched_recs)
+    return _format_recommendations(enriched_recs)
+
 @tool
 def summarize_movie_taste() -> str:
     """Summarize the user's movie taste and assess recommendation fit."""
-    global watched_cache, recommended_cache
-    if not watched_cache:
-        watched_cache = _fetch_movies()
-    if isinstance(watched_cache, dict) and 'error' in watched_cache:
-        return watched_cache['error']
-
-    watched_titles = [m['Name'] for m in watched_cache]
-    recommended_titles = [m['name'] for m in recommended_cache]
+    session = current_session()
+    profile = _fetch_profile()
+    if profile and 'error' in profile:
+        return profile['error']
+
+    watched_titles = profile['recent_titles'] if profile else []
+    recommended_titles = [m['name'] for m in session.get("recommended", [])]
     return explain_recommendations(watched_titles, recommended_titles)
 
+@tool
+def recommend_and_summarize_movies(genre: str = None, language: str = None) -> str:
+    """
+    Fetch the user's Emby history, recommend movies from Qloo and summarize how they fit the user's taste, in one step.
+    Accepts the same optional genre and language filters as recommend_movies.
+    Returns the complete answer: the '**Recommended Movies:**' list followed by the taste summary.
+    """
+    recommendations, summary = recommendation_pipeline(genre, language)
+    if not recommendations:
+        return "I couldn't find any movies matching your request. Would you like to try a different genre or language?"
+    answer = "**Recommended Movies:**\n" + "\n".join(recommendations)
+    return answer + "\n\n" + summary if summary else answer
+
 @tool
 def fetch_trending_movies() -> List[dict]:
     """Fetch trending (most watched) movies from Emby."""
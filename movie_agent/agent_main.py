@@ -4,12 +4,13 @@ from dotenv import load_dotenv
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
-from ._movie_tools import fetch_watched_movies, recommend_movies, summarize_movie_taste, fetch_trending_movies, fetch_recent_movies
+from ._movie_tools import fetch_watched_movies, recommend_movies, summarize_movie_taste, recommend_and_summarize_movies, fetch_trending_movies, fetch_recent_movies
 
 tools = [
     fetch_watched_movies,
     recommend_movies,
     summarize_movie_taste,
+    recommend_and_summarize_movies,
     fetch_trending_movies,
     fetch_recent_movies
 ]
@@ -18,28 +19,29 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 dotenv_path = os.path.join(script_dir, '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
-GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in .env")
-
-llm = ChatGoogleGenerativeAI(
-    model="models/gemini-2.0-flash-lite",
-    google_api_key=GOOGLE_API_KEY,
-    temperature=0.6
-)
-
-tools = [fetch_watched_movies, recommend_movies, summarize_movie_taste, fetch_trending_movies, fetch_recent_movies]
-
 prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a friendly Movie Agent, ready to talk all things cinema! I can chat with you about movies, genres, actors, or anything else related to films. If you want me to analyze your movie taste or provide recommendations, please explicitly ask me to do so. For example, you can say \"Recommend some movies for me\" or \"What kind of movies do I like?\"\n\nHere's how I can help with recommendations and taste analysis:\n\n- If the user asks for movie recommendations or taste analysis, first use the `fetch_watched_movies` tool to get their watched history from Emby. Then, use the `recommend_movies` tool to get taste-based recommendations from Qloo. The recommendations will be a list of markdown-formatted strings with movie titles and image URLs. You MUST present these recommendations to the user exactly as they are returned from the tool, under the heading '**Recommended Movies:**'. Do not reformat or change the list. Finally, use the `summarize_movie_taste` tool to summarize how well the recommendations match the user's taste.\n- If the user specifies a genre (e.g., \"recommend comedy movies\") or a language (e.g., \"recommend french movies\"), use the `genre` or `language` arguments in the `recommend_movies` tool.\n- The language filter is robust and supports a wide variety of languages, including but not limited to English, French, Spanish, Hindi, and Tamil. When a user asks for movies in a specific language, pass the language name directly to the `language` argument in the `recommend_movies` tool.\n- Even if you cannot find genre information for the recommended movies, you should still present the list of movies to the user. Do not apologize for being unable to filter. Simply provide the list you were able to retrieve.\n- If the `recommend_movies` tool returns an empty list, it means no movies were found matching the user's request. In this case, you should inform the user that you couldn't find any movies matching their criteria and ask if they would like to try a different search.\n- If the user asks for trending movies, use the `fetch_trending_movies` tool. If it returns an empty list, inform the user that you couldn't find any trending movies.\n- If the user asks for recent movies, use the `fetch_recent_movies` tool.\n\nOtherwise, engage in general conversation about movies."),
+    ("system", "You are a friendly Movie Agent, ready to talk all things cinema! I can chat with you about movies, genres, actors, or anything else related to films. If you want me to analyze your movie taste or provide recommendations, please explicitly ask me to do so. For example, you can say \"Recommend some movies for me\" or \"What kind of movies do I like?\"\n\nHere's how I can help with recommendations and taste analysis:\n\n- If the user asks for movie recommendations, call the `recommend_and_summarize_movies` tool once. It fetches their watched history from Emby, gets taste-based recommendations from Qloo and summarizes how well they match the user's taste in a single step. It returns the complete answer: a '**Recommended Movies:**' heading, a list of markdown-formatted strings with movie titles and image URLs, and the taste summary. You MUST present this answer to the user exactly as it is returned from the tool. Do not reformat or change the list, and do not call `fetch_watched_movies`, `recommend_movies` or `summarize_movie_taste` for the same request.\n- If the user only wants to see their watch history, use `fetch_watched_movies`. If they only ask what kind of movies they like, use `summarize_movie_taste`.\n- If the user specifies a genre (e.g., \"recommend comedy movies\") or a language (e.g., \"recommend french movies\"), use the `genre` or `language` arguments in the `recommend_and_summarize_movies` tool.\n- The language filter is robust and supports a wide variety of languages, including but not limited to English, French, Spanish, Hindi, and Tamil. When a user asks for movies in a specific language, pass the language name directly to the `language` argument in the `recommend_and_summarize_movies` tool.\n- Even if you cannot find genre information for the recommended movies, you should still present the list of movies to the user. Do not apologize for being unable to filter. Simply provide the list you were able to retrieve.\n- If the `recommend_and_summarize_movies` tool reports that it couldn't find any movies, nothing matched the user's request. In this case, you should inform the user that you couldn't find any movies matching their criteria and ask if they would like to try a different search.\n- If the user asks for trending movies, use the `fetch_trending_movies` tool. If it returns an empty list, inform the user that you couldn't find any trending movies.\n- If the user asks for recent movies, use the `fetch_recent_movies` tool.\n\nOtherwise, engage in general conversation about movies."),
     ("human", "{input}"),
     ("placeholder", "{agent_scratchpad}")
 ])
 
-agent = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+def build_agent_executor():
+    """Build the movie AgentExecutor. Called lazily by common.agent_registry."""
+    google_api_key = os.getenv("GEMINI_API_KEY")
+    if not google_api_key:
+        raise ValueError("GEMINI_API_KEY not found in .env")
+
+    llm = ChatGoogleGenerativeAI(
+        model="models/gemini-2.0-flash-lite",
+        google_api_key=google_api_key,
+        temperature=0.6
+    )
+    agent = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
+    return AgentExecutor(agent=agent, tools=tools, verbose=True)
 
 if __name__ == "__main__":
+    agent_executor = build_agent_executor()
+
     # First, fetch watched movies to find the most common genre
     watched_movies = fetch_watched_movies.invoke({})
     if isinstance(watched_movies, dict) and 'error' in watched_movies:
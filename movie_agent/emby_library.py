@@ -0,0 +1,180 @@
+# emby_library.py
+import os
+import re
+import time
+import threading
+import datetime
+import unicodedata
+from common import http_utils
+from common.emby_query import item_query
+from common.json_utils import response_json
+
+EMBY_LIBRARY_REFRESH = int(os.getenv("EMBY_LIBRARY_REFRESH", "300"))  # seconds between delta syncs
+EMBY_LIBRARY_FULL_SYNC = int(os.getenv("EMBY_LIBRARY_FULL_SYNC", "3600"))  # seconds between full re-syncs
+EMBY_LIBRARY_PAGE_SIZE = int(os.getenv("EMBY_LIBRARY_PAGE_SIZE", "500"))
+
+LIBRARY_FIELDS = 'Genres,ProductionYear,PremiereDate,DateCreated'
+
+
+def normalize_title(title):
+    """Normalize a movie title so Qloo and Emby spellings of the same film compare equal."""
+    if not title:
+        return ""
+    title = unicodedata.normalize("NFKD", title)
+    title = "".join(c for c in title if not unicodedata.combining(c))
+    title = title.casefold().replace("&", " and ")
+    title = re.sub(r"[^\w\s]", " ", title)
+    title = re.sub(r"^(the|a|an)\s+", "", title.strip())
+    return re.sub(r"\s+", " ", title).strip()
+
+
+def _to_movie(m):
+    return {
+        'Name': m.get('Name'),
+        'Id': m.get('Id'),
+        'Year': m.get('ProductionYear'),
+        'Genres': (
+            m.get('Genres') or
+            [g['Name'] for g in m.get('GenreItems', []) if 'Name' in g]
+        ),
+        'PremiereDate': m.get('PremiereDate'),
+        'DateCreated': m.get('DateCreated'),
+    }
+
+
+class EmbyLibrary:
+    """In-process mirror of the Emby movie library, indexed by normalized title and year.
+
+    The first sync pulls every movie; later syncs only ask Emby for items saved since
+    the previous one (``MinDateLastSaved``). A periodic full sync drops deleted items.
+    """
+
+    def __init__(self, emby_server, api_key):
+        self.emby_server = emby_server
+        self.api_key = api_key
+        self._items = {}
+        self._by_title = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._last_saved = None
+        self._last_delta = 0.0
+        self._last_full = 0.0
+
+    def _fetch_items(self, extra_params=None):
+        url = f"{self.emby_server}/Items"
+        start = 0
+        while True:
+            params = {
+                'IncludeItemTypes': 'Movie',
+                'Recursive': 'true',
+                'StartIndex': start,
+                'Limit': EMBY_LIBRARY_PAGE_SIZE,
+                'api_key': self.api_key,
+                **item_query(LIBRARY_FIELDS),
+            }
+            if extra_params:
+                params.update(extra_params)
+            res = http_utils.get(url, params=params)
+            res.raise_for_status()
+            data = response_json(res)
+            page = data.get('Items', [])
+            yield from page
+            start += len(page)
+            if not page or start >= data.get('TotalRecordCount', 0):
+                break
+
+    def _index(self, movie):
+        old = self._items.get(movie['Id'])
+        if old:
+            ids = self._by_title.get(normalize_title(old['Name']), [])
+            if movie['Id'] in ids:
+                ids.remove(movie['Id'])
+        self._items[movie['Id']] = movie
+        self._by_title.setdefault(normalize_title(movie['Name']), []).append(movie['Id'])
+
+    def sync(self, full=False):
+        """Pull the whole library (full=True) or only items saved since the last sync."""
+        started = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=1)
+        extra = None if full or not self._last_saved else {'MinDateLastSaved': self._last_saved}
+        movies = [_to_movie(m) for m in self._fetch_items(extra) if m.get('Id')]
+
+        with self._lock:
+            if extra is None:
+                self._items = {}
+                self._by_title = {}
+            for movie in movies:
+                self._index(movie)
+            self._last_saved = started.strftime("%Y-%m-%dT%H:%M:%SZ")
+            now = time.time()
+            self._last_delta = now
+            if extra is None:
+                self._last_full = now
+        print(f"[📚] Emby library {'full' if extra is None else 'delta'} sync: {len(movies)} items, {len(self._items)} total")
+
+    def ensure_fresh(self):
+        """Sync if the mirror is stale. Returns True when the mirror can be used for lookups."""
+        now = time.time()
+        if self._last_full and now - self._last_delta < EMBY_LIBRARY_REFRESH:
+            return True
+        with self._sync_lock:
+            now = time.time()
+            try:
+                if not self._last_full or now - self._last_full >= EMBY_LIBRARY_FULL_SYNC:
+                    self.sync(full=True)
+                elif now - self._last_delta >= EMBY_LIBRARY_REFRESH:
+                    self.sync()
+            except Exception as e:
+                print(f"[❌] Emby library sync failed: {e}")
+        return bool(self._last_full)
+
+    def lookup(self, title, year=None):
+        """Return the library movie matching ``title`` (preferring ``year``), or None."""
+        with self._lock:
+            candidates = [self._items[i] for i in self._by_title.get(normalize_title(title), [])]
+        if not candidates:
+            return None
+        try:
+            year = int(year) if year else None
+        except (TypeError, ValueError):
+            year = None  # unparseable years (e.g. "2019-05-01") match on title alone
+        if year:
+            for tolerance in (0, 1):
+                for movie in candidates:
+                    if movie['Year'] and abs(movie['Year'] - year) <= tolerance:
+                        return movie
+        return candidates[0]
+
+    def contains(self, title, year=None):
+        return self.lookup(title, year) is not None
+
+    def recent_movies(self, from_date, limit=20):
+        """Movies premiered on or after ``from_date``, newest additions first."""
+        from_str = from_date.isoformat()
+        with self._lock:
+            recent = [m for m in self._items.values() if (m['PremiereDate'] or '')[:10] >= from_str]
+        recent.sort(key=lambda m: m['DateCreated'] or '', reverse=True)
+        return [{
+            'Name': m['Name'],
+            'Id': m['Id'],
+            'Year': m['Year'],
+            'Genres': m['Genres']
+        } for m in recent[:limit]]
+
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+
+def get_library(emby_server, api_key):
+    """Shared EmbyLibrary for a server/API key pair."""
+    key = (emby_server, api_key)
+    with _libraries_lock:
+        if key not in _libraries:
+            _libraries[key] = EmbyLibrary(emby_server, api_key)
+        return _libraries[key]
+
+
+def reset_libraries():
+    """Drop every library mirror; the next get_library starts from a full sync."""
+    with _libraries_lock:
+        _libraries.clear()
@@ -1,17 +1,29 @@
 # emby_utils.py
 import requests
+from common import http_utils
+from common.emby_query import item_query
+from common.json_utils import response_json
+from common.qloo_utils import qloo_get
+from common.session_state import note_error
 import json
 import os
 from dotenv import load_dotenv
+from .emby_library import get_library
 
 load_dotenv()
 
+_user_ids = {}
+
 # Fetch Emby user ID by name
 def get_user_id(emby_server, api_key, username):
+    cache_key = (emby_server, username.lower())
+    if cache_key in _user_ids:
+        return _user_ids[cache_key]
+
     url = f"{emby_server}/Users"
     try:
-        res = requests.get(url, params={'api_key': api_key})
-        data = json.loads(res.content.decode("utf-8-sig"))
+        res = http_utils.get(url, params={'api_key': api_key})
+        data = response_json(res)
 
         if not isinstance(data, list):
             print("[ERROR] Emby response is not a list.")
@@ -22,6 +34,7 @@ def get_user_id(emby_server, api_key, username):
             name = user.get("Name")
             if name and name.lower() == username.lower():
                 print(f"[✅] Found user '{name}' with ID: {user.get('Id')}")
+                _user_ids[cache_key] = user.get("Id")
                 return user.get("Id")
 
         print(f"[❌] USER_NAME '{username}' not found in Emby Users list.")
@@ -29,57 +42,102 @@ def get_user_id(emby_server, api_key, username):
 
     except Exception as e:
         print("[❌] Exception while fetching USER_ID:", e)
+        note_error("emby_user", e)
         print("[DEBUG] URL tried:", url)
         return None
 
-# Fetch watched movies from Emby
-def get_watched_movies(emby_server, api_key, user_id):
+EMBY_PAGE_SIZE = int(os.getenv("EMBY_PAGE_SIZE", "200"))  # items per Emby page
+EMBY_WATCHED_LIMIT = int(os.getenv("EMBY_WATCHED_LIMIT", "0")) or None  # keep only the N most recent plays
+
+def _to_watched_movie(m):
+    return {
+        'Name': m.get('Name'),
+        'Id': m.get('Id'),
+        'Year': m.get('ProductionYear'),
+        'Genres': (
+            m.get('Genres') or
+            [g['Name'] for g in m.get('GenreItems', []) if 'Name' in g] or
+            m.get('Tags', [])
+        ),
+        'People': m.get('People', []),
+        'LastPlayed': m.get('UserData', {}).get('LastPlayedDate'),
+    }
+
+def iter_watched_movies(emby_server, api_key, user_id, page_size=EMBY_PAGE_SIZE, limit=EMBY_WATCHED_LIMIT,
+                        fields='Genres,Tags', user_data=False):
+    """Yield the user's played movies, most recently played first, one StartIndex/Limit page at a time.
+
+    Only one page is held in memory; ``limit`` stops paging after the N most recent items.
+    ``LastPlayed`` is only filled in when ``user_data`` is set.
+    """
+    url = f"{emby_server}/Users/{user_id}/Items"
+    start = 0
+    yielded = 0
+    while True:
+        params = {
+            'IncludeItemTypes': 'Movie',
+            'Recursive': 'true',
+            'SortBy': 'DatePlayed',
+            'SortOrder': 'Descending',
+            'Filters': 'IsPlayed',
+            'StartIndex': start,
+            'Limit': min(page_size, limit - yielded) if limit else page_size,
+            'api_key': api_key,
+            **item_query(fields, user_data=user_data),
+        }
+        res = http_utils.get(url, params=params)
+        res.raise_for_status()  # Raise an exception for bad status codes
+        if "html" in res.headers.get("Content-Type", ""):
+            print("[ERROR] Emby returned HTML instead of JSON. Check server URL or API key.")
+            print("[DEBUG] Response:", res.text[:200])
+            return
+
+        data = response_json(res)
+        page = data.get('Items', [])
+        for m in page:
+            yield _to_watched_movie(m)
+        yielded += len(page)
+        start += len(page)
+        if not page or start >= data.get('TotalRecordCount', 0) or (limit and yielded >= limit):
+            return
+
+def get_watched_fingerprint(emby_server, api_key, user_id):
+    """Cheap marker of the user's played history: played count plus the most recent play."""
     url = f"{emby_server}/Users/{user_id}/Items"
     params = {
         'IncludeItemTypes': 'Movie',
         'Recursive': 'true',
         'SortBy': 'DatePlayed',
+        'SortOrder': 'Descending',
         'Filters': 'IsPlayed',
-        'Fields': 'Genres,GenreItems,Tags',
+        'Limit': 1,
         'api_key': api_key,
-        
+        **item_query(user_data=True),
     }
+    res = http_utils.get(url, params=params)
+    res.raise_for_status()
+    data = response_json(res)
+    items = data.get('Items', [])
+    latest = items[0] if items else {}
+    last_played = latest.get('UserData', {}).get('LastPlayedDate', '')
+    return f"{data.get('TotalRecordCount', 0)}:{latest.get('Id', '')}:{last_played}"
 
+# Fetch watched movies from Emby
+def get_watched_movies(emby_server, api_key, user_id, limit=EMBY_WATCHED_LIMIT):
     try:
-        res = requests.get(url, params=params)
-        res.raise_for_status()  # Raise an exception for bad status codes
-        data = res.json()
-        with open("get_watched_movies.json",'w')as f:
-            json.dump(data,f)
-        if "html" in res.headers.get("Content-Type", ""):
-            print("[ERROR] Emby returned HTML instead of JSON. Check server URL or API key.")
-            print("[DEBUG] Response:", res.text[:200])
-            return []
-
-        movies = data.get('Items', [])
-        if not movies:
-            print("[INFO] No watched movies found in Emby.")
-
+        movies = list(iter_watched_movies(emby_server, api_key, user_id, limit=limit))
     except requests.exceptions.RequestException as e:
         print(f"[ERROR] Emby API request failed: {e}")
+        note_error("emby_watched", e)
         return []
     except json.JSONDecodeError as e:
         print(f"[ERROR] Failed to parse JSON: {e}")
-        print(f"[DEBUG] Raw response: {res.content[:200]}")
+        note_error("emby_watched", e)
         return []
 
-    return [{
-        'Name': m.get('Name'),
-        'Id': m.get('Id'),
-        'Year': m.get('ProductionYear'),
-        'Genres': (
-            m.get('Genres') or
-            [g['Name'] for g in m.get('GenreItems', []) if 'Name' in g] or
-            m.get('Tags', [])
-        ),
-        'People': m.get('People', [])
-    } for m in movies]
-
+    if not movies:
+        print("[INFO] No watched movies found in Emby.")
+    return movies
 
 def get_movie_details(emby_server, api_key, movie_name):
     """Fetch movie details from Emby, including genres."""
@@ -88,14 +146,14 @@ def get_movie_details(emby_server, api_key, movie_name):
         'Recursive': 'true',
         'IncludeItemTypes': 'Movie',
         'SearchTerm': movie_name,
-        'Fields': 'Genres,GenreItems',
-        'api_key': api_key
+        'api_key': api_key,
+        **item_query('Genres'),
     }
     print(f"[DEBUG] Searching Emby for '{movie_name}' with URL: {requests.Request('GET', url, params=params).prepare().url}")
     try:
-        res = requests.get(url, params=params)
+        res = http_utils.get(url, params=params)
         res.raise_for_status()
-        data = res.json().get('Items', [])
+        data = response_json(res).get('Items', [])
         if data:
             print(f"[DEBUG] Found {len(data)} items for '{movie_name}'. Using first result.")
             movie = data[0] # Assume the first result is the correct one
@@ -109,15 +167,14 @@ def get_movie_details(emby_server, api_key, movie_name):
             print(f"[DEBUG] No items found on Emby for '{movie_name}'.")
     except Exception as e:
         print(f"[❌] Error fetching movie details for '{movie_name}': {e}")
+        note_error("emby_details", e)
     return {'Genres': []}
 
 # Use Qloo Insights API for movie recommendations
-def get_qloo_recommendations(genre_urn=None, year_min=2022, location_query=None, language=None):
-    url = "https://hackathon.api.qloo.com/v2/insights"
-    headers = {
-        "x-api-key": os.getenv("QLOO_API_KEY")
-    }
+def _qloo_genres(entity):
+    return [t.get("name") for t in entity.get("tags", []) if str(t.get("type", "")).startswith("urn:tag:genre") and t.get("name")]
 
+def get_qloo_recommendations(genre_urn=None, year_min=2022, location_query=None, language=None, take=None):
     params = {
         "filter.type": "urn:entity:movie",
         "filter.release_year.min": year_min
@@ -129,28 +186,31 @@ def get_qloo_recommendations(genre_urn=None, year_min=2022, location_query=None,
         params["signal.location.query"] = location_query
     if language:
         params["filter.language"] = language
+    if take:
+        params["take"] = take
 
     try:
-        res = requests.get(url, headers=headers, params=params)
-        if res.status_code == 200:
-            results = res.json().get("results", {})
-            entities = results.get("entities", [])
-            
-            # Extract name and image URL
-            movies_with_images = []
-            for e in entities:
-                name = e.get("name")
-                image_url = e.get("properties", {}).get("image", {}).get("url")
-                if name:
-                    movies_with_images.append({"name": name, "image_url": image_url})
-            
-            return movies_with_images
-        else:
-            print("[❌] Qloo Insights API failed:", res.status_code)
-            print(res.text)
-            return []
+        results = qloo_get("/v2/insights", params).get("results", {})
+        entities = results.get("entities", [])
+
+        # Extract name and image URL
+        movies_with_images = []
+        for e in entities:
+            name = e.get("name")
+            image_url = e.get("properties", {}).get("image", {}).get("url")
+            year = e.get("properties", {}).get("release_year")
+            if name:
+                movies_with_images.append({"name": name, "image_url": image_url, "year": year, "genres": _qloo_genres(e)})
+
+        return movies_with_images
+    except requests.exceptions.HTTPError as e:
+        print("[❌] Qloo Insights API failed:", e.response.status_code)
+        print(e.response.text)
+        note_error("qloo", e)
+        return []
     except Exception as e:
         print("[❌] Exception in Qloo insights:", e)
+        note_error("qloo", e)
         return []
 
 
@@ -162,12 +222,13 @@ def get_trending_movies(emby_server, api_key):
     params = {
         'IncludeItemTypes': 'Movie',
         'Limit': 20,
-        'api_key': api_key
+        'api_key': api_key,
+        **item_query('Genres'),
     }
 
     try:
-        res = requests.get(url, params=params)
-        data = res.json().get('Items', [])
+        res = http_utils.get(url, params=params)
+        data = response_json(res).get('Items', [])
         return [{
             'Name': m.get('Name'),
             'Id': m.get('Id'),
@@ -176,6 +237,7 @@ def get_trending_movies(emby_server, api_key):
         } for m in data]
     except Exception as e:
         print("[❌] Error fetching trending movies:", e)
+        note_error("emby_trending", e)
         return []
 
 # Fetch recently released movies (within last X months)
@@ -184,21 +246,25 @@ def get_recent_movies(emby_server, api_key, months=3):
     from_date = today - datetime.timedelta(days=30 * months)
     from_str = from_date.isoformat()
 
+    library = get_library(emby_server, api_key)
+    if library.ensure_fresh():
+        return library.recent_movies(from_date, limit=20)
+
     url = f"{emby_server}/Items"
     params = {
         'IncludeItemTypes': 'Movie',
         'SortBy': 'DateCreated',
         'SortOrder': 'Descending',
-        'Fields': 'Genres',
         'Limit': 20,
         'api_key': api_key,
         'StartIndex': 0,
-        'MinPremiereDate': from_str
+        'MinPremiereDate': from_str,
+        **item_query('Genres'),
     }
 
     try:
-        res = requests.get(url, params=params)
-        data = res.json().get('Items', [])
+        res = http_utils.get(url, params=params)
+        data = response_json(res).get('Items', [])
         return [{
             'Name': m.get('Name'),
             'Id': m.get('Id'),
@@ -207,5 +273,6 @@ def get_recent_movies(emby_server, api_key, months=3):
         } for m in data]
     except Exception as e:
         print("[❌] Error fetching recent movies:", e)
+        note_error("emby_recent", e)
         return []
 
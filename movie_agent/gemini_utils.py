@@ -2,20 +2,35 @@
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
+from common.llm_cache import llm_cache, llm_cache_key
+from common import metrics
+from common.session_state import note_error
 
 load_dotenv()
 
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("Missing GEMINI_API_KEY in .env file.")
-genai.configure(api_key=api_key)
+MODEL_NAME = "models/gemini-1.5-flash"
+_model = None
 
-model = genai.GenerativeModel(model_name="models/gemini-1.5-flash")
+def _get_model():
+    """Configure genai and build the model on first use rather than at import."""
+    global _model
+    if _model is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("Missing GEMINI_API_KEY in .env file.")
+        genai.configure(api_key=api_key)
+        _model = genai.GenerativeModel(model_name=MODEL_NAME)
+    return _model
 
 def explain_recommendations(watched_titles, recommended_titles):
     if not watched_titles or not recommended_titles:
         return "[ERROR] Both watched and recommended movie lists are required."
 
+    key = llm_cache_key(MODEL_NAME, "movie_taste", watched=watched_titles[:5], recommended=recommended_titles[:5])
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+
     prompt = (
         f"I have watched these movies: {', '.join(watched_titles[:5])}.\n"
         f"And these movies were recommended to me: {', '.join(recommended_titles[:5])}.\n"
@@ -23,12 +38,18 @@ def explain_recommendations(watched_titles, recommended_titles):
     )
 
     try:
-        response = model.generate_content(prompt)
+        with metrics.llm_seconds.time(model=MODEL_NAME):
+            response = _get_model().generate_content(prompt)
+        metrics.record_genai_usage(MODEL_NAME, response)
         if hasattr(response, "text"):
-            return response.text.strip()
+            text = response.text.strip()
         elif hasattr(response, "candidates"):
-            return response.candidates[0].text.strip()
+            text = response.candidates[0].text.strip()
         else:
+            note_error("gemini", "unexpected response format")
             return "[ERROR] Unexpected Gemini response format."
+        llm_cache.set(key, text)
+        return text
     except Exception as e:
+        note_error("gemini", e)
         return f"[ERROR] Gemini response failed: {e}"
@@ -0,0 +1,120 @@
+# intent_router.py
+import re
+from ._movie_tools import recommend_and_summarize_movies, fetch_trending_movies, fetch_recent_movies
+from common.metrics_callbacks import METRICS_CONFIG
+
+GENRES = {
+    "action", "adventure", "animation", "biography", "comedy", "crime", "documentary",
+    "drama", "family", "fantasy", "history", "horror", "music", "musical", "mystery",
+    "romance", "science fiction", "sci-fi", "sport", "thriller", "war", "western",
+}
+GENRE_ALIASES = {"sci-fi": "science fiction", "scifi": "science fiction", "romantic": "romance", "animated": "animation"}
+
+LANGUAGES = {
+    "english", "french", "spanish", "german", "italian", "japanese", "korean", "chinese",
+    "hindi", "tamil", "telugu", "malayalam", "kannada", "bengali", "marathi", "portuguese",
+    "russian", "turkish", "arabic", "persian", "thai", "swedish", "danish", "norwegian",
+}
+
+# Words that may surround an intent without making the request open-ended
+FILLER = {
+    "a", "an", "the", "some", "any", "few", "s", "of", "me", "for", "to", "i", "can", "could",
+    "you", "please", "pls", "give", "show", "find", "get", "list", "what", "are", "is", "there",
+    "watch", "in", "language", "genre", "good", "great", "best", "my", "based", "on", "taste",
+    "and", "with", "hey", "hi", "would", "like", "want", "now", "right", "currently", "today",
+}
+
+MOVIE_WORDS = {"movie", "movies", "film", "films"}
+RECOMMEND_WORDS = {"recommend", "recommendation", "recommendations", "suggest", "suggestion", "suggestions"}
+TRENDING_WORDS = {"trending", "popular", "hot"}
+RECENT_WORDS = {"recent", "recently", "new", "newest", "latest", "released", "added"}
+
+
+def _tokens(message):
+    message = message.casefold()
+    for alias, genre in GENRE_ALIASES.items():
+        message = re.sub(rf"\b{re.escape(alias)}\b", genre, message)
+    return re.findall(r"[a-z]+(?:-[a-z]+)?|\d+", message)
+
+
+def detect_intent(message):
+    """Classify a movie-agent message as recommend / trending / recent with genre and language slots.
+
+    Returns None for anything open-ended: every word must be an intent keyword, a
+    slot value or filler, so e.g. "movies like Inception" falls back to the agent.
+    Messages mixing intents ("trending comedy movies") also fall back.
+    """
+    tokens = _tokens(message)
+    if not set(tokens) & (MOVIE_WORDS | RECOMMEND_WORDS | TRENDING_WORDS | RECENT_WORDS):
+        return None
+
+    genre = None
+    language = None
+    leftover = []
+    i = 0
+    while i < len(tokens):
+        pair = " ".join(tokens[i:i + 2])
+        if pair in GENRES:
+            genre = pair
+            i += 2
+            continue
+        token = tokens[i]
+        if token in GENRES:
+            genre = token
+        elif token in LANGUAGES:
+            language = token
+        elif token.isdigit() or token in FILLER or token in MOVIE_WORDS:
+            pass
+        elif token not in RECOMMEND_WORDS | TRENDING_WORDS | RECENT_WORDS:
+            leftover.append(token)
+        i += 1
+    if leftover:
+        return None
+
+    words = set(tokens)
+    intents = [
+        name for name, present in (
+            ("trending", words & TRENDING_WORDS),
+            ("recent", words & RECENT_WORDS),
+            ("recommend", words & RECOMMEND_WORDS or genre or language),
+        ) if present
+    ]
+    # "trending comedy movies" or "recent sci-fi movies" combine intents no single tool serves
+    if len(intents) != 1:
+        return None
+    if intents[0] == "recommend":
+        return {"intent": "recommend", "genre": genre, "language": language}
+    return {"intent": intents[0]}
+
+
+def _format_movies(movies):
+    lines = []
+    for m in movies:
+        genres = ", ".join(m.get("Genres") or [])
+        year = f" ({m['Year']})" if m.get("Year") else ""
+        lines.append(f"* **{m.get('Name')}**{year}" + (f" - {genres}" if genres else ""))
+    return "\n".join(lines)
+
+
+def route(message):
+    """Answer common requests by calling the tools directly; None means "use the agent"."""
+    intent = detect_intent(message)
+    if intent is None:
+        return None
+    print(f"[⚡] Fast path: {intent}")
+
+    if intent["intent"] == "trending":
+        movies = fetch_trending_movies.invoke({}, config=METRICS_CONFIG)
+        if not movies:
+            return "I couldn't find any trending movies right now."
+        return "**Trending Movies:**\n" + _format_movies(movies)
+
+    if intent["intent"] == "recent":
+        movies = fetch_recent_movies.invoke({}, config=METRICS_CONFIG)
+        if not movies:
+            return "I couldn't find any recently released movies on your server."
+        return "**Recent Movies:**\n" + _format_movies(movies)
+
+    # The tool's arg schema rejects explicit None, so only filled slots are passed
+    slots = {k: v for k, v in intent.items() if k in ("genre", "language") and v}
+    return recommend_and_summarize_movies.invoke(slots, config=METRICS_CONFIG)
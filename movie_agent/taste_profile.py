@@ -0,0 +1,248 @@
+# taste_profile.py
+import os
+import json
+import time
+import sqlite3
+import datetime
+import threading
+from common.paths import data_path
+from common.session_state import note_error
+from common.taste_engine import TasteVector
+from .emby_utils import iter_watched_movies, EMBY_PAGE_SIZE
+
+TASTE_PROFILE_DB = os.getenv("TASTE_PROFILE_DB")  # defaults to DATA_DIR/taste_profile.sqlite3
+TASTE_PROFILE_REFRESH = int(os.getenv("TASTE_PROFILE_REFRESH", "60"))  # seconds between incremental syncs per user
+TASTE_PROFILE_HALF_LIFE_DAYS = float(os.getenv("TASTE_PROFILE_HALF_LIFE_DAYS", "180"))  # play age at which its weight halves
+TASTE_PROFILE_TOP_PEOPLE = int(os.getenv("TASTE_PROFILE_TOP_PEOPLE", "20"))
+TASTE_PROFILE_RECENT_TITLES = int(os.getenv("TASTE_PROFILE_RECENT_TITLES", "20"))
+TASTE_PROFILE_SYNC_PAGE = int(os.getenv("TASTE_PROFILE_SYNC_PAGE", "50"))  # page size once a watermark exists
+
+PROFILE_FIELDS = 'Genres,Tags,People'
+PEOPLE_TYPES = {'Actor', 'Director'}
+PROFILE_VERSION = 2  # bumped when stored weights change meaning; older profiles are rebuilt
+
+
+def _played_at(last_played):
+    """Emby LastPlayedDate ("2024-05-01T12:34:56.0000000Z") as a UTC datetime, or None."""
+    if not last_played:
+        return None
+    try:
+        return datetime.datetime.strptime(last_played[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=datetime.timezone.utc)
+    except ValueError:
+        return None
+
+
+def _decay_weight(played_at, reference):
+    """2 ** -(days from ``played_at`` back to ``reference`` / half-life); 1.0 without dates.
+
+    Weights are relative to the newest play (the watermark), so they stay in (0, 1]
+    whatever the half-life; plays after the reference count as 1.0.
+    """
+    if played_at is None or reference is None:
+        return 1.0
+    days = max(0.0, (reference - played_at).total_seconds() / 86400)
+    return 2.0 ** (-days / TASTE_PROFILE_HALF_LIFE_DAYS)
+
+
+def _rescale(weights, factor):
+    for key in weights:
+        weights[key] *= factor
+
+
+def _empty_profile(user_id):
+    return {
+        'version': PROFILE_VERSION,
+        'user_id': user_id,
+        'watermark': None,
+        'total': 0,
+        'genres': {},
+        'genre_weights': {},
+        'years': {},
+        'decade_weights': {},
+        'top_people': [],
+        'recent_titles': [],
+        'updated_at': None,
+    }
+
+
+def profile_vector(profile):
+    """TasteVector built from a stored profile's recency-weighted genre and decade sums."""
+    return TasteVector.from_weights(profile.get('genre_weights', {}), profile.get('decade_weights', {}))
+
+
+class TasteProfileStore:
+    """sqlite-backed per-user taste profile: genre counts, year histogram and top people.
+
+    Each sync asks Emby for plays newest first and stops at the stored last-played
+    watermark, so only items played since the previous sync are fetched. The
+    aggregates live in a single row per user, so reads cost the same however long
+    the history is.
+    """
+
+    def __init__(self, path=None):
+        path = path or TASTE_PROFILE_DB or data_path("taste_profile.sqlite3")
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._user_locks = {}
+        self._last_sync = {}
+        with self._lock:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, profile TEXT);"
+                "CREATE TABLE IF NOT EXISTS played (user_id TEXT, item_id TEXT, PRIMARY KEY (user_id, item_id));"
+                "CREATE TABLE IF NOT EXISTS people (user_id TEXT, name TEXT, count INTEGER,"
+                " PRIMARY KEY (user_id, name));"
+                "CREATE INDEX IF NOT EXISTS people_by_count ON people (user_id, count DESC);"
+            )
+            self._db.commit()
+
+    def get(self, user_id):
+        with self._lock:
+            row = self._db.execute("SELECT profile FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def clear(self):
+        with self._lock:
+            self._db.executescript("DELETE FROM profiles; DELETE FROM played; DELETE FROM people;")
+            self._db.commit()
+            self._last_sync.clear()
+
+    def _reset_user(self, user_id):
+        with self._lock:
+            for table in ('profiles', 'played', 'people'):
+                self._db.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+            self._db.commit()
+
+    def _user_lock(self, user_id):
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def sync(self, emby_server, api_key, user_id):
+        """Fold plays newer than the watermark into the profile; returns the updated profile."""
+        with self._user_lock(user_id):
+            profile = self.get(user_id)
+            if profile is not None and profile.get('version') != PROFILE_VERSION:
+                print(f"[🧭] Rebuilding taste profile for {user_id} (stored format is outdated)")
+                self._reset_user(user_id)
+                profile = None
+            profile = profile or _empty_profile(user_id)
+            watermark = profile['watermark']
+            new_items = []
+            # The first sync walks the whole history; later ones usually stop inside one small page
+            page_size = TASTE_PROFILE_SYNC_PAGE if watermark else EMBY_PAGE_SIZE
+            plays = iter_watched_movies(
+                emby_server, api_key, user_id, page_size=page_size, limit=None, fields=PROFILE_FIELDS, user_data=True
+            )
+            for movie in plays:
+                last_played = movie.get('LastPlayed')
+                if watermark and last_played and last_played < watermark:
+                    break
+                new_items.append(movie)
+
+            if new_items:
+                profile = self._apply(profile, new_items)
+            self._last_sync[user_id] = time.monotonic()
+            return profile
+
+    def _apply(self, profile, movies):
+        user_id = profile['user_id']
+        genres = profile['genres']
+        genre_weights = profile['genre_weights']
+        years = profile['years']
+        decade_weights = profile['decade_weights']
+        people = {}
+        fresh = []
+        watermark = profile['watermark']
+        played = [m['LastPlayed'] for m in movies if m.get('LastPlayed')]
+        if played:
+            profile['watermark'] = max(played + ([watermark] if watermark else []))
+        reference = _played_at(profile['watermark'])
+        previous = _played_at(watermark)
+        if previous and reference and reference > previous:
+            # Re-anchor the stored sums on the new newest play, as if they had been weighed against it
+            factor = _decay_weight(previous, reference)
+            _rescale(genre_weights, factor)
+            _rescale(decade_weights, factor)
+
+        with self._lock:
+            for movie in movies:
+                # Replays come back with a newer LastPlayedDate; each title is counted once
+                inserted = self._db.execute(
+                    "INSERT OR IGNORE INTO played (user_id, item_id) VALUES (?, ?)", (user_id, movie.get('Id'))
+                ).rowcount
+                if not inserted:
+                    continue
+
+                fresh.append(movie)
+                weight = _decay_weight(_played_at(movie.get('LastPlayed')), reference)
+                movie_genres = movie.get('Genres') or []
+                for genre in movie_genres:
+                    genres[genre] = genres.get(genre, 0) + 1
+                    # Genres of one title share its weight, as in TasteVector
+                    genre_weights[genre] = genre_weights.get(genre, 0.0) + weight / len(movie_genres)
+                year = movie.get('Year')
+                if year:
+                    years[str(year)] = years.get(str(year), 0) + 1
+                    decade = str(int(year) // 10 * 10)
+                    decade_weights[decade] = decade_weights.get(decade, 0.0) + weight
+                for person in movie.get('People') or []:
+                    name = person.get('Name')
+                    if name and person.get('Type') in PEOPLE_TYPES:
+                        people[name] = people.get(name, 0) + 1
+
+            if not fresh and profile['watermark'] == watermark:
+                return profile  # only the plays at the watermark itself came back
+            self._db.executemany(
+                "INSERT INTO people (user_id, name, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, name) DO UPDATE SET count = count + excluded.count",
+                [(user_id, name, count) for name, count in people.items()],
+            )
+            profile['top_people'] = self._db.execute(
+                "SELECT name, count FROM people WHERE user_id = ? ORDER BY count DESC LIMIT ?",
+                (user_id, TASTE_PROFILE_TOP_PEOPLE),
+            ).fetchall()
+            profile['total'] += len(fresh)
+            # Newest first: plays from this sync, then what was already recent
+            recent = [m['Name'] for m in movies if m.get('Name')] + profile['recent_titles']
+            profile['recent_titles'] = list(dict.fromkeys(recent))[:TASTE_PROFILE_RECENT_TITLES]
+            profile['updated_at'] = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, profile) VALUES (?, ?)", (user_id, json.dumps(profile))
+            )
+            self._db.commit()
+
+        print(f"[🧭] Taste profile for {user_id}: {len(fresh)} new of {len(movies)} synced, {profile['total']} total")
+        return profile
+
+    def load(self, emby_server, api_key, user_id):
+        """Stored profile, synced first if the last sync is older than TASTE_PROFILE_REFRESH.
+
+        A failed sync falls back to the stored profile, if there is one.
+        """
+        last = self._last_sync.get(user_id)
+        if last is not None and time.monotonic() - last < TASTE_PROFILE_REFRESH:
+            profile = self.get(user_id)
+            if profile is not None:
+                return profile
+        try:
+            return self.sync(emby_server, api_key, user_id)
+        except Exception as e:
+            print(f"[❌] Taste profile sync failed for {user_id}: {e}")
+            note_error("taste_profile", e)
+            return self.get(user_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TasteProfileStore()
+    return _store
+
+
+def load_profile(emby_server, api_key, user_id):
+    return get_store().load(emby_server, api_key, user_id)
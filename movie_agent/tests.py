@@ -0,0 +1,231 @@
+import asyncio
+import os
+import requests
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.test import RequestFactory, SimpleTestCase
+
+from movie_agent import taste_profile
+from movie_agent.taste_profile import TasteProfileStore, profile_vector
+from common.session_state import agent_run, note_error, request_session_ids, run_degraded
+
+
+def _play(item_id, genre, last_played, year=2020):
+    return {'Id': item_id, 'Name': f"Movie {item_id}", 'Year': year, 'Genres': [genre], 'People': [], 'LastPlayed': last_played}
+
+
+class TasteProfileDecayTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TasteProfileStore(os.path.join(self.tmp.name, "profiles.sqlite3"))
+
+    def tearDown(self):
+        self.store._db.close()
+        self.tmp.cleanup()
+
+    def _sync(self, plays):
+        newest_first = sorted(plays, key=lambda m: m['LastPlayed'], reverse=True)
+        with mock.patch.object(taste_profile, 'iter_watched_movies', return_value=iter(newest_first)):
+            return self.store.sync("http://emby", "key", "user")
+
+    def test_short_half_life_keeps_recency_and_finite_weights(self):
+        # Years of weekly horror, then a week of comedy: with a 7-day half-life comedy must dominate
+        plays = [_play(f"h{i}", "Horror", f"{2019 + i // 52}-{i % 52 // 5 + 1:02d}-{i % 5 * 5 + 1:02d}T20:00:00.0000000Z")
+                 for i in range(300)]
+        plays += [_play(f"c{i}", "Comedy", f"2025-06-{i + 1:02d}T20:00:00.0000000Z") for i in range(3)]
+        with mock.patch.object(taste_profile, 'TASTE_PROFILE_HALF_LIFE_DAYS', 7.0):
+            profile = self._sync(plays)
+
+        weights = profile['genre_weights']
+        self.assertTrue(all(0.0 <= w < float('inf') for w in weights.values()))
+        self.assertGreater(weights['Comedy'], weights['Horror'])
+
+        taste = profile_vector(profile)
+        scores = taste.similarity([{'genres': ['Comedy'], 'year': 2020}, {'genres': ['Horror'], 'year': 2020}])
+        self.assertGreater(scores[0], 0.0)
+        self.assertGreater(scores[0], scores[1])
+
+    def test_incremental_sync_matches_full_sync(self):
+        older = [_play("a", "Drama", "2025-01-01T00:00:00.0000000Z"), _play("b", "Action", "2025-02-01T00:00:00.0000000Z")]
+        newer = [_play("c", "Drama", "2025-03-01T00:00:00.0000000Z")]
+        with mock.patch.object(taste_profile, 'TASTE_PROFILE_HALF_LIFE_DAYS', 7.0):
+            self._sync(older)
+            incremental = self._sync(older + newer)
+
+            self.store.clear()
+            full = self._sync(older + newer)
+
+        for genre, weight in full['genre_weights'].items():
+            self.assertAlmostEqual(incremental['genre_weights'][genre], weight)
+        self.assertEqual(incremental['watermark'], newer[0]['LastPlayed'])
+
+
+class IntentRouterTests(SimpleTestCase):
+    def test_single_intents(self):
+        from movie_agent.intent_router import detect_intent
+
+        self.assertEqual(detect_intent("What's trending?"), {"intent": "trending"})
+        self.assertEqual(detect_intent("show me the latest movies"), {"intent": "recent"})
+        self.assertEqual(detect_intent("Recommend some movies for me"),
+                         {"intent": "recommend", "genre": None, "language": None})
+        self.assertEqual(detect_intent("recommend french comedy movies"),
+                         {"intent": "recommend", "genre": "comedy", "language": "french"})
+        self.assertEqual(detect_intent("show me sci-fi movies"),
+                         {"intent": "recommend", "genre": "science fiction", "language": None})
+
+    def test_combined_intents_fall_back_to_the_agent(self):
+        from movie_agent.intent_router import detect_intent
+
+        for message in (
+            "trending comedy movies",
+            "show me recent sci-fi movies",
+            "what are the latest hindi movies",
+            "recommend trending movies",
+            "suggest some new movies",
+        ):
+            with self.subTest(message=message):
+                self.assertIsNone(detect_intent(message))
+
+    def test_open_ended_requests_fall_back_to_the_agent(self):
+        from movie_agent.intent_router import detect_intent
+
+        self.assertIsNone(detect_intent("movies like Inception"))
+        self.assertIsNone(detect_intent("tell me a joke"))
+
+    def test_route_passes_only_filled_slots_to_the_recommend_tool(self):
+        from movie_agent import intent_router
+
+        for message, expected in (
+            ("Recommend some movies for me", {}),
+            ("recommend comedy movies", {"genre": "comedy"}),
+            ("recommend french comedy movies", {"genre": "comedy", "language": "french"}),
+        ):
+            with self.subTest(message=message), \
+                    mock.patch.object(intent_router, "recommend_and_summarize_movies") as tool:
+                tool.invoke.return_value = "**Recommended Movies:**\n* **Movie**"
+                self.assertEqual(intent_router.route(message), "**Recommended Movies:**\n* **Movie**")
+                tool.invoke.assert_called_once()
+                self.assertEqual(tool.invoke.call_args.args[0], expected)
+
+    def test_route_slots_pass_the_real_tool_schema(self):
+        from movie_agent import intent_router
+
+        for message in ("Recommend some movies for me", "recommend comedy movies", "recommend french comedy movies"):
+            with self.subTest(message=message), \
+                    mock.patch("movie_agent._movie_tools.recommendation_pipeline", return_value=(["* **Movie**"], None)):
+                self.assertEqual(intent_router.route(message), "**Recommended Movies:**\n* **Movie**")
+
+
+class ResponseCacheKeyTests(SimpleTestCase):
+    def _key(self, executor):
+        from common import response_cache
+        with mock.patch.object(response_cache, 'aget_agent_executor', mock.AsyncMock(return_value=executor)), \
+                mock.patch.object(response_cache, 'response_cache_key', return_value="movie|fp|hi"):
+            return asyncio.run(response_cache.aresponse_cache_key("movie", "hi"))
+
+    def test_agents_without_memory_are_cached(self):
+        self.assertEqual(self._key(mock.Mock(memory=None)), "movie|fp|hi")
+
+    def test_agents_with_memory_are_not_cached(self):
+        self.assertIsNone(self._key(mock.Mock(memory=object())))
+
+
+class DegradedRunCacheTests(SimpleTestCase):
+    def setUp(self):
+        from common import response_cache
+        self.module = response_cache
+        response_cache.response_cache.clear()
+        self.addCleanup(response_cache.response_cache.clear)
+
+    def _invoke(self, route):
+        with mock.patch.object(self.module, 'aresponse_cache_key', mock.AsyncMock(return_value="movie|fp|hi")), \
+                mock.patch.object(self.module, 'aroute_message', mock.AsyncMock(side_effect=route)):
+            with agent_run("tester", "degraded"):
+                return asyncio.run(self.module.ainvoke_with_cache("movie", "hi"))
+
+    def test_clean_runs_are_cached(self):
+        self.assertEqual(self._invoke(lambda agent, message: "reply"), ("reply", False))
+        self.assertEqual(self.module.response_cache.get("movie|fp|hi"), "reply")
+
+    def test_runs_with_upstream_errors_are_not_cached(self):
+        def route(agent, message):
+            note_error("qloo", "timeout")
+            return "reply with fallback genres"
+
+        self.assertEqual(self._invoke(route), ("reply with fallback genres", False))
+        self.assertIsNone(self.module.response_cache.get("movie|fp|hi"))
+
+    def test_tool_errors_reported_to_the_callbacks_mark_the_run(self):
+        from common.metrics_callbacks import metrics_handler
+        with agent_run("tester", "degraded"):
+            metrics_handler.on_tool_start({"name": "fetch_watched_movies"}, "", run_id="r1")
+            metrics_handler.on_tool_end({"error": "EMBY_SERVER must be set"}, run_id="r1")
+            self.assertTrue(run_degraded())
+        with agent_run("tester", "degraded"):
+            self.assertFalse(run_degraded())
+
+
+class LibraryEnrichmentTests(SimpleTestCase):
+    def _library(self):
+        from movie_agent.emby_library import EmbyLibrary
+        library = EmbyLibrary("http://emby", "key")
+        library._index({'Id': '1', 'Name': 'Dune', 'Year': 2021, 'Genres': ['Science Fiction'], 'PremiereDate': None, 'DateCreated': None})
+        return library
+
+    def test_lookup_ignores_unparseable_years(self):
+        library = self._library()
+        self.assertEqual(library.lookup("Dune", "2021-10-22")['Id'], '1')
+        self.assertEqual(library.lookup("Dune", "unknown")['Id'], '1')
+        self.assertEqual(library.lookup("Dune", 2021)['Id'], '1')
+
+    def test_one_bad_item_does_not_fail_the_batch(self):
+        from movie_agent import _movie_tools
+        library = mock.Mock()
+        library.ensure_fresh.return_value = True
+        library.lookup.side_effect = [KeyError('Genres'), {'Genres': ['Drama']}]
+        movies = [{'name': 'Broken', 'genres': ['Action']}, {'name': 'Fine'}]
+        with mock.patch.object(_movie_tools, 'get_library', return_value=library):
+            enriched = _movie_tools._enrich_movies(movies)
+        self.assertEqual([m['genres'] for m in enriched], [['Action'], ['Drama']])
+        self.assertEqual([m['in_library'] for m in enriched], [False, True])
+
+
+class RequestSessionIdTests(SimpleTestCase):
+    def _request(self, session=None):
+        request = RequestFactory().post("/movie_agent_api/")
+        if session is None:
+            SessionMiddleware(lambda r: None).process_request(request)
+        else:
+            request.session = session
+        request.user = AnonymousUser()
+        return request
+
+    def test_anonymous_clients_get_a_stable_id_without_a_session_write(self):
+        request = self._request()
+        with mock.patch.object(request.session, 'save') as save:
+            user_id, conversation_id = request_session_ids(request, {})
+        save.assert_not_called()
+        self.assertTrue(user_id.startswith("session:"))
+        self.assertEqual(conversation_id, "default")
+        self.assertTrue(request.session.modified)  # SessionMiddleware persists it with the response
+
+        again = self._request(session=request.session)
+        self.assertEqual(request_session_ids(again, {"conversation_id": "c2"}), (user_id, "c2"))
+
+    def test_authenticated_users_are_keyed_by_pk(self):
+        request = self._request()
+        request.user = mock.Mock(is_authenticated=True, pk=7)
+        self.assertEqual(request_session_ids(request, {})[0], "user:7")
+        self.assertFalse(request.session.modified)
+
+
+class ArtistSearchTests(SimpleTestCase):
+    def test_malformed_search_responses_return_none(self):
+        from spotify_agent import artist_resolver
+        for failure in (ValueError("bad JSON"), KeyError("results"), requests.exceptions.ConnectionError("down")):
+            with mock.patch.object(artist_resolver, 'qloo_get', side_effect=failure):
+                self.assertIsNone(artist_resolver.search_artist("Radiohead"))
+        with mock.patch.object(artist_resolver, 'qloo_get', return_value={'results': [{'name': None}, {'name': 'radiohead'}]}):
+            self.assertEqual(artist_resolver.search_artist("Radiohead")['name'], 'radiohead')
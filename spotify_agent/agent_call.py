@@ -11,22 +11,8 @@ import json
 # Load environment variables from .env file
 load_dotenv()
 
-# Get the API key from environment variables
-api_key = os.getenv("GEMINI_API_KEY")
-
-
-# Check if the API key is available
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in .env file")
-
-memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-# Initialize the language model
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash-lite",
-    temperature=0.7,
-    top_p=0.85,
-    google_api_key=api_key
-)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SYSTEM_PROMPT_PATH = os.getenv("SPOTIFY_SYSTEM_PROMPT_PATH", os.path.join(script_dir, "system_prompt.txt"))
 
 # Define the tools the agent can use
 tools = [
@@ -39,29 +25,42 @@ tools = [
 
 ]
 
-# Updated system prompt
-# In agent_call.py
-with open("/var/www/Taste_Based_AI_Assistant/spotify_agent/system_prompt.txt", "r") as f:
-    system_prompt = f.read()
-
-prompt = ChatPromptTemplate.from_messages([
-    ("system", system_prompt),
-    ("human", "{input}"),
-    ("placeholder", "{agent_scratchpad}")
-])
 
+def build_agent_executor():
+    """Build the Spotify AgentExecutor. Called lazily by common.agent_registry."""
+    # Get the API key from environment variables
+    api_key = os.getenv("GEMINI_API_KEY")
 
+    # Check if the API key is available
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in .env file")
 
+    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    # Initialize the language model
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash-lite",
+        temperature=0.7,
+        top_p=0.85,
+        google_api_key=api_key
+    )
 
+    with open(SYSTEM_PROMPT_PATH, "r") as f:
+        system_prompt = f.read()
 
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", "{input}"),
+        ("placeholder", "{agent_scratchpad}")
+    ])
 
-# Create agent
-agent = create_tool_calling_agent(llm, tools, prompt)
+    # Create agent
+    agent = create_tool_calling_agent(llm, tools, prompt)
 
-# Create  agent executor
-agent_executor = AgentExecutor(agent=agent, tools=tools,memory=memory, verbose=True)
+    # Create  agent executor
+    return AgentExecutor(agent=agent, tools=tools,memory=memory, verbose=True)
 
 if __name__ == "__main__":
+    agent_executor = build_agent_executor()
     query = "Get recommendations from my spotify account."
     response = agent_executor.invoke({"input": query})
 
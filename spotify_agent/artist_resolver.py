@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from common.paths import data_path
+from common.qloo_utils import qloo_get
+from common.session_state import note_error
+
+load_dotenv()
+
+ARTIST_STORE_PATH = os.getenv("ARTIST_STORE_PATH")  # defaults to DATA_DIR/artist_store.sqlite3
+ARTIST_RESOLVE_WORKERS = int(os.getenv("ARTIST_RESOLVE_WORKERS", "8"))  # concurrent Qloo searches
+
+# Qloo tag type -> field of the artist profile it is collected into
+TAG_FIELDS = {
+    'urn:tag:genre': 'genres',
+    'urn:tag:audience:qloo': 'audiences',
+    'urn:tag:style:qloo': 'styles',
+    'urn:tag:characteristic:qloo': 'characteristics',
+    'urn:tag:influence:qloo': 'influences',
+    'urn:tag:influenced_by:qloo': 'influenced_by_artists',
+    'urn:tag:instrument:qloo': 'instruments',
+    'urn:tag:theme:qloo': 'themes',
+    'urn:tag:subgenre:qloo': 'subgenres',
+}
+
+
+def _name_key(name):
+    return " ".join(name.split()).casefold()
+
+
+def _to_profile(result):
+    profile = {
+        'name': result.get('name'),
+        'entity_id': result.get('entity_id'),
+        'image_url': result.get('properties', {}).get('image', {}).get('url'),
+    }
+    for field in TAG_FIELDS.values():
+        profile[field] = []
+    for tag in result.get('tags', []):
+        field = TAG_FIELDS.get(tag.get('type'))
+        if field:
+            profile[field].append(tag.get('name'))
+    return profile
+
+
+class ArtistStore:
+    """sqlite-backed map of artist name -> Qloo entity id and tag profile."""
+
+    def __init__(self, path=None):
+        path = path or ARTIST_STORE_PATH or data_path("artist_store.sqlite3")
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS artists (name_key TEXT PRIMARY KEY, profile TEXT, updated_at REAL)"
+            )
+            self._db.commit()
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT name_key, profile FROM artists WHERE name_key IN ({placeholders})", list(keys)
+            ).fetchall()
+        return {key: json.loads(profile) for key, profile in rows}
+
+    def put_many(self, profiles):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO artists (name_key, profile, updated_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(profile), now) for key, profile in profiles.items()],
+            )
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM artists")
+            self._db.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtistStore()
+    return _store
+
+
+def search_artist(name):
+    """Look an artist up on Qloo /search and return its profile, or None if there is no exact name match."""
+    query = {'query': name,
+             'types': "urn:entity:artist",
+             'sort_by': 'match'}
+    try:
+        data = qloo_get("/search", query)
+        for result in (data or {}).get('results', []):
+            if (result.get('name') or '').lower() == name.lower():
+                return _to_profile(result)
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"[❌] Qloo search failed for '{name}': {e}")
+        note_error("qloo_search", e)
+    return None
+
+
+def resolve_artists(names):
+    """Profiles for ``names`` in input order; stored artists need no network call, the rest are searched concurrently."""
+    keys = []
+    key_names = {}
+    for name in names:
+        key = _name_key(name)
+        if key and key not in key_names:
+            keys.append(key)
+            key_names[key] = name
+
+    store = get_store()
+    profiles = store.get_many(keys)
+    missing = [key for key in keys if key not in profiles]
+    if missing:
+        workers = max(1, min(ARTIST_RESOLVE_WORKERS, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            found = dict(zip(missing, pool.map(search_artist, [key_names[k] for k in missing])))
+        found = {key: profile for key, profile in found.items() if profile}
+        if found:
+            store.put_many(found)
+        profiles.update(found)
+        print(f"[🎵] Resolved {len(keys)} artists: {len(keys) - len(missing)} stored, {len(found)} fetched from Qloo")
+
+    return [profiles[key] for key in keys if key in profiles]
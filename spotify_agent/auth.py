@@ -1,7 +1,9 @@
 import os
 import json
 import time
-import requests
+import tempfile
+import threading
+from common import http_utils
 import base64
 import urllib.parse
 from http.server import HTTPServer, BaseHTTPRequestHandler
@@ -15,6 +17,8 @@ CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 REDIRECT_URI = os.getenv("SPOTIFY_CLIENT_REDIRECT_URL")
 SCOPE = "user-read-recently-played user-read-playback-state playlist-read-private playlist-read-collaborative user-library-read"
 ACCESS_TOKEN_PATH = "access_token.json"
+SPOTIFY_TOKEN_REFRESH_MARGIN = int(os.getenv("SPOTIFY_TOKEN_REFRESH_MARGIN", "120"))  # seconds before expiry to refresh
+DEFAULT_SPOTIFY_USER = "default"
 
 class AuthHandler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -64,9 +68,10 @@ def get_auth_code():
     return code
 
 def exchange_code_for_token(code):
+    """Trade an authorization code for token data (with ``expires_at``)."""
     auth_str = f"{CLIENT_ID}:{CLIENT_SECRET}"
     b64_auth = base64.b64encode(auth_str.encode()).decode()
-    response = requests.post(
+    response = http_utils.post(
         "https://accounts.spotify.com/api/token",
         headers={"Authorization": f"Basic {b64_auth}"},
         data={
@@ -78,20 +83,16 @@ def exchange_code_for_token(code):
     data = response.json()
     if "access_token" not in data:
         raise Exception("Token exchange failed: " + str(data))
-    
-    expires_at = time.time() + data["expires_in"] - 60
-    data["expires_at"] = expires_at
-
-    with open(ACCESS_TOKEN_PATH, 'w') as f:
-        json.dump(data, f)
-    print("Token exchange response:", response.status_code, response.text)
 
-    return data["access_token"]
+    data["expires_at"] = time.time() + data["expires_in"]
+    print("Token exchange response:", response.status_code)
+    return data
 
 def refresh_token(refresh_token):
+    """Refresh an access token; returns new token data, keeping the old refresh token if none is issued."""
     auth_str = f"{CLIENT_ID}:{CLIENT_SECRET}"
     b64_auth = base64.b64encode(auth_str.encode()).decode()
-    response = requests.post(
+    response = http_utils.post(
         "https://accounts.spotify.com/api/token",
         headers={"Authorization": f"Basic {b64_auth}"},
         data={
@@ -102,30 +103,104 @@ def refresh_token(refresh_token):
     data = response.json()
     if "access_token" not in data:
         raise Exception("Refresh failed: " + str(data))
-    
-    with open(ACCESS_TOKEN_PATH, 'r') as f:
-        old_data = json.load(f)
-
-    data["refresh_token"] = data.get("refresh_token", old_data["refresh_token"])
-    data["expires_at"] = time.time() + data["expires_in"] - 60
-
-    with open(ACCESS_TOKEN_PATH, 'w') as f:
-        json.dump(data, f)
 
-    return data["access_token"]
-
-def get_access_token():
-    if os.path.exists(ACCESS_TOKEN_PATH):
-        with open(ACCESS_TOKEN_PATH, 'r') as f:
-            data = json.load(f)
-            if time.time() < data.get("expires_at", 0):
+    data["refresh_token"] = data.get("refresh_token", refresh_token)
+    data["expires_at"] = time.time() + data["expires_in"]
+    return data
+
+
+class SpotifyTokenManager:
+    """Thread-safe, in-memory Spotify token store for one or more accounts.
+
+    Tokens are refreshed once they are within SPOTIFY_TOKEN_REFRESH_MARGIN seconds
+    of ``expires_at``. Only one refresh per account runs at a time: while it is in
+    flight, other callers keep using the still-valid token, or wait for the
+    refresh if the token has already expired. Token files are written atomically.
+    """
+
+    def __init__(self, refresh_margin=SPOTIFY_TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _user_lock(self, user_key):
+        with self._locks_lock:
+            return self._locks.setdefault(user_key, threading.Lock())
+
+    def _path(self, user_key):
+        if user_key == DEFAULT_SPOTIFY_USER:
+            return ACCESS_TOKEN_PATH
+        safe_key = "".join(c if c.isalnum() or c in "-_" else "_" for c in user_key)
+        root, ext = os.path.splitext(ACCESS_TOKEN_PATH)
+        return f"{root}_{safe_key}{ext}"
+
+    def _load(self, user_key):
+        path = self._path(user_key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save(self, user_key, data):
+        path = os.path.abspath(self._path(user_key))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".token-")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def set_token(self, user_key, data):
+        """Register token data obtained elsewhere (e.g. a web OAuth callback) for ``user_key``."""
+        self._tokens[user_key] = data
+        self._save(user_key, data)
+
+    def get_token(self, user_key=DEFAULT_SPOTIFY_USER):
+        data = self._tokens.get(user_key)
+        now = time.time()
+        if data and now < data.get("expires_at", 0) - self.refresh_margin:
+            return data["access_token"]
+
+        lock = self._user_lock(user_key)
+        still_valid = data and now < data.get("expires_at", 0)
+        if still_valid:
+            # Proactive refresh: whoever gets the lock refreshes, the rest keep the current token
+            if not lock.acquire(blocking=False):
                 return data["access_token"]
-            else:
-                return refresh_token(data["refresh_token"])
-    else:
-        code = get_auth_code()
-        return exchange_code_for_token(code)
-
+        else:
+            lock.acquire()
+        try:
+            data = self._tokens.get(user_key) or self._load(user_key)
+            if data and time.time() < data.get("expires_at", 0) - self.refresh_margin:
+                self._tokens[user_key] = data
+                return data["access_token"]
+            current = data
+            try:
+                if current and current.get("refresh_token"):
+                    data = refresh_token(current["refresh_token"])
+                else:
+                    data = exchange_code_for_token(get_auth_code())
+            except Exception as e:
+                if current and time.time() < current.get("expires_at", 0):
+                    print(f"[❌] Spotify token refresh failed, using current token: {e}")
+                    return current["access_token"]
+                raise
+            self.set_token(user_key, data)
+            return data["access_token"]
+        finally:
+            lock.release()
+
+
+token_manager = SpotifyTokenManager()
+
+def get_access_token(user_key=DEFAULT_SPOTIFY_USER):
+    return token_manager.get_token(user_key)
 
 if __name__ == "__main__":
     token = get_access_token()
@@ -1,38 +1,123 @@
 import os
 from dotenv import load_dotenv
-import requests
+from common import http_utils
+from common.json_utils import response_json
 import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain_core.tools import tool
 from .auth import get_access_token
 import pydantic_core
 
+load_dotenv()
 
-TOKEN = get_access_token()
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com/v1").rstrip("/")
+SPOTIFY_PAGE_WORKERS = int(os.getenv("SPOTIFY_PAGE_WORKERS", "4"))  # concurrent page fetches per listing
+SPOTIFY_MAX_ITEMS = int(os.getenv("SPOTIFY_MAX_ITEMS", "0")) or None  # optional cap on items per listing
+SPOTIFY_PAGE_RETRIES = int(os.getenv("SPOTIFY_PAGE_RETRIES", "2"))  # extra attempts per failed page before giving up
 
-load_dotenv()
 
+def _auth_headers():
+    """Spotify auth header, resolving the access token at call time."""
+    return {"Authorization": f"Bearer {get_access_token()}"}
 
-@tool
-def get_playlist():
-    """Fetches the user's playlists from Spotify and parses them."""
-    url = "https://api.spotify.com/v1/me/playlists"
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    response = requests.get(url, headers=headers)
-    data = response.json()
 
-    if 'items' not in data:
-        return []
+def _fetch_all_pages(url, page_size, parse_items):
+    """Fetch every page of an offset-paginated Spotify listing.
 
+    The first page reports ``total``; the remaining offsets are fetched concurrently
+    and each page is parsed as it arrives into its slot, so the result keeps
+    Spotify's order. Returns None if the first response has no ``items``.
+    A page that still fails after SPOTIFY_PAGE_RETRIES retries raises, so a
+    truncated listing is never returned (or cached downstream) as complete.
+    """
+    headers = _auth_headers()
+    data = response_json(http_utils.get(url, headers=headers, params={"limit": page_size, "offset": 0}))
+    if 'items' not in data:
+        return None
+
+    total = data.get('total') or len(data['items'])
+    if SPOTIFY_MAX_ITEMS:
+        total = min(total, SPOTIFY_MAX_ITEMS)
+    offsets = list(range(page_size, total, page_size))
+    pages = [parse_items(data['items'])] + [[] for _ in offsets]
+
+    def fetch(offset):
+        for attempt in range(SPOTIFY_PAGE_RETRIES + 1):
+            try:
+                res = http_utils.get(url, headers=headers, params={"limit": page_size, "offset": offset})
+                res.raise_for_status()
+                return parse_items(response_json(res)['items'])
+            except Exception as e:
+                if attempt == SPOTIFY_PAGE_RETRIES:
+                    raise
+                print(f"[⏳] Spotify page {offset} of {url} failed ({e}), retrying")
+                time.sleep(0.5 * 2 ** attempt)
+
+    if offsets:
+        with ThreadPoolExecutor(max_workers=max(1, min(SPOTIFY_PAGE_WORKERS, len(offsets)))) as pool:
+            futures = {pool.submit(fetch, offset): slot for slot, offset in enumerate(offsets, start=1)}
+            for future in as_completed(futures):
+                try:
+                    pages[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"[❌] Spotify page fetch failed for {url}: {e}")
+                    raise
+
+    items = [item for page in pages for item in page]
+    return items[:total]
+
+
+def library_fingerprint():
+    """Hash of playlist snapshot ids, the latest play and the liked-songs count; changes when the library does."""
+    headers = _auth_headers()
+    playlists = http_utils.get(f"{SPOTIFY_API_BASE}/me/playlists", headers=headers, params={"limit": 50}).json()
+    recent = http_utils.get(f"{SPOTIFY_API_BASE}/me/player/recently-played", headers=headers, params={"limit": 1}).json()
+    liked = http_utils.get(f"{SPOTIFY_API_BASE}/me/tracks", headers=headers, params={"limit": 1}).json()
+    if 'items' not in playlists:
+        return None
+
+    parts = [p.get('snapshot_id') for p in playlists['items'] if p]
+    parts += [item.get('played_at') for item in recent.get('items', [])]
+    parts += [liked.get('total')] + [item.get('added_at') for item in liked.get('items', [])]
+    return hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+
+def _parse_playlists(items):
     parsed_playlists = []
-    for item in data['items']:
-        playlist_name = item.get('name')
-        playlist_id = item.get('id')
-        playlist_uri = item.get('uri')
-
+    for item in items:
+        if not item:
+            continue
         parsed_playlists.append({
-            "playlist_name": playlist_name,
-            "playlist_id": playlist_id,
+            "playlist_name": item.get('name'),
+            "playlist_id": item.get('id'),
         })
+    return parsed_playlists
+
+
+def _parse_tracks(items):
+    parsed_tracks = []
+    for item in items:
+        track = (item or {}).get('track', {})
+        if not track:
+            continue
+
+        parsed_tracks.append({
+            "track_name": track.get('name'),
+            "artists": [artist['name'] for artist in track.get('artists', [])],
+            "album_name": track.get('album', {}).get('name'),
+            "release_date": track.get('album', {}).get('release_date'),
+        })
+    return parsed_tracks
+
+
+@tool
+def get_playlist():
+    """Fetches the user's playlists from Spotify and parses them."""
+    parsed_playlists = _fetch_all_pages(f"{SPOTIFY_API_BASE}/me/playlists", 50, _parse_playlists)
+    if parsed_playlists is None:
+        return []
     return json.dumps(parsed_playlists, indent=2)
 
 
@@ -41,9 +126,10 @@ def get_playlist():
 @tool
 def get_last_played():
     """Fetches the user's recently played tracks with detailed information."""
-    url = "https://api.spotify.com/v1/me/player/recently-played?limit=10"
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    response = requests.get(url, headers=headers)
+    # recently-played is cursor-paginated and capped at 50 items, so one request covers it
+    url = f"{SPOTIFY_API_BASE}/me/player/recently-played?limit=50"
+    headers = _auth_headers()
+    response = http_utils.get(url, headers=headers)
     data = response.json()
 
     if 'items' not in data:
@@ -67,62 +153,16 @@ def get_last_played():
 @tool
 def get_song_list(playlist_ID:str) :
     """Fetches the songs from a specific playlist with detailed information."""
-    url = f"https://api.spotify.com/v1/playlists/{playlist_ID}/tracks"
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    response = requests.get(url, headers=headers)
-    data = response.json()
-
-    if 'items' not in data:
+    parsed_tracks = _fetch_all_pages(f"{SPOTIFY_API_BASE}/playlists/{playlist_ID}/tracks", 100, _parse_tracks)
+    if parsed_tracks is None:
         return []
-
-    parsed_tracks = []
-    for item in data['items']:
-        track = item.get('track', {})
-        if not track:
-            continue
-
-        track_name = track.get('name')
-        artists = [artist['name'] for artist in track.get('artists', [])]
-        album_name = track.get('album', {}).get('name')
-        release_date = track.get('album', {}).get('release_date')
-        track_uri = track.get('uri')
-
-        parsed_tracks.append({
-            "track_name": track_name,
-            "artists": artists,
-            "album_name": album_name,
-            "release_date": release_date,
-        })
     return json.dumps(parsed_tracks, indent=2)
 
 
 @tool
 def get_liked_songs():
     """Fetches the user's liked songs from Spotify with detailed information."""
-    url = "https://api.spotify.com/v1/me/tracks?limit=50"
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    response = requests.get(url, headers=headers)
-    data = response.json()
-
-    if 'items' not in data:
+    parsed_tracks = _fetch_all_pages(f"{SPOTIFY_API_BASE}/me/tracks", 50, _parse_tracks)
+    if parsed_tracks is None:
         return []
-
-    parsed_tracks = []
-    for item in data['items']:
-        track = item.get('track', {})
-        if not track:
-            continue
-
-        track_name = track.get('name')
-        artists = [artist['name'] for artist in track.get('artists', [])]
-        album_name = track.get('album', {}).get('name')
-        release_date = track.get('album', {}).get('release_date')
-        track_uri = track.get('uri')
-
-        parsed_tracks.append({
-            "track_name": track_name,
-            "artists": artists,
-            "album_name": album_name,
-            "release_date": release_date,
-        })
     return json.dumps(parsed_tracks, indent=2)
@@ -1,4 +1,8 @@
 import requests
+from common import http_utils
+from common.qloo_utils import qloo_get
+from common.swr_cache import StaleWhileRevalidate
+from .artist_resolver import resolve_artists
 import json
 from dotenv import load_dotenv
 import os
@@ -11,7 +15,8 @@ load_dotenv()
 
 QLOO_API_KEY = os.getenv('QLOO_API_KEY')
 BASE_URL ="https://hackathon.api.qloo.com/v2/insights/"
-BASE_URL_1 ="https://hackathon.api.qloo.com/search"
+
+insights_cache = StaleWhileRevalidate("artist_insights")
 
 from typing import TypedDict, List
 from pydantic import BaseModel, Field
@@ -53,7 +58,7 @@ def get_entity_id(tracks: TrackRequest):
             "filter.tags": tag_string,
         }
 
-        response = requests.get(BASE_URL, headers=headers, params=params)
+        response = http_utils.get(BASE_URL, headers=headers, params=params)
 
         if response.status_code != 200:
             return response.json()
@@ -67,76 +72,19 @@ def get_entity_id(tracks: TrackRequest):
 @tool(args_schema=ArtistNames)
 def get_artist_entity_id(names:list):
     """Gets the entity ID for the specified artists."""
-    headers={'x-api-key':QLOO_API_KEY}
-    artist_id =[]
-    for name in names:
-        query={'query':name,
-               'types':"urn:entity:artist",
-               'sort_by':'match'}
-        response= requests.get(
-            url=BASE_URL_1,
-            headers=headers,
-            params=query
-        )
-        data = response.json()
-        if data and 'results' in data:
-            for result in data['results']:
-               
-                if result.get('name', '').lower() == name.lower():
-                    artist_info = {
-                        'name': result.get('name'),
-                        'entity_id': result.get('entity_id'),
-                        'image_url': result.get('properties', {}).get('image', {}).get('url'),
-                        'genres': [],
-                        'audiences': [],
-                        'styles': [],
-                        'characteristics': [],
-                        'influences': [],
-                        'influenced_by_artists': [],
-                        'instruments': [],
-                        'themes': [],
-                        'subgenres': []
-                    }
-                    if 'tags' in result:
-                        for tag in result['tags']:
-                            if tag.get('type') == 'urn:tag:genre':
-                                artist_info['genres'].append(tag.get('name'))
-                            elif tag.get('type') == 'urn:tag:audience:qloo':
-                                artist_info['audiences'].append(tag.get('name'))
-                            elif tag.get('type') == 'urn:tag:style:qloo':
-                                artist_info['styles'].append(tag.get('name'))
-                            elif tag.get('type') == 'urn:tag:characteristic:qloo':
-                                artist_info['characteristics'].append(tag.get('name'))
-                            elif tag.get('type') == 'urn:tag:influence:qloo':
-                                artist_info['influences'].append(tag.get('name'))
-                            elif tag.get('type') == 'urn:tag:influenced_by:qloo':
-                                artist_info['influenced_by_artists'].append(tag.get('name'))
-                            elif tag.get('type') == 'urn:tag:instrument:qloo':
-                                artist_info['instruments'].append(tag.get('name'))
-                            elif tag.get('type') == 'urn:tag:theme:qloo':
-                                artist_info['themes'].append(tag.get('name'))
-                            elif tag.get('type') == 'urn:tag:subgenre:qloo':
-                                artist_info['subgenres'].append(tag.get('name'))
-                    artist_id.append(artist_info)
-                    break 
-    with open("artist_entity_id_.json",'w') as f:
-        json.dump(artist_id,f)
-    return artist_id
+    return resolve_artists(names)
 
 @tool(args_schema=EntityIds)
 def get_insights(entity_ids: list):
     """Gets insights from Qloo API using a list of entity IDs."""
-    headers = {"x-api-key": QLOO_API_KEY}
-    
     params = {
         "filter.type": "urn:entity:artist",
         "signal.interests.entities": ",".join(entity_ids),
     }
     
     try:
-        response = requests.get("https://hackathon.api.qloo.com/v2/insights", headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
+        key = ",".join(sorted(entity_ids))
+        data = insights_cache.get_or_compute(key, lambda: qloo_get("/v2/insights", params))
         with open("insights.json",'w')as f:
             json.dump(data,f) 
         